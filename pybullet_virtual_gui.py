@@ -3,6 +3,10 @@ PyBullet GUI simulation that mirrors the real robot command interface.
 
 Usage:
   - Run: python pybullet_virtual_gui.py
+  - Standby: python pybullet_virtual_gui.py --standby
+    Loads the heavy modules and waits for commands on stdin, one per line:
+    "show" opens the window, "hide" closes it, "exit" (or EOF) quits.
+    The server uses it as a prewarmed process so opening the GUI is instant.
   - Send commands (comma-separated floats, 24 values max) via UDP to 127.0.0.1:5556
     Example (PowerShell):
       $udp = New-Object System.Net.Sockets.UdpClient; \
@@ -14,10 +18,12 @@ and updates a simple visual model if the original URDF is not available.
 """
 from __future__ import annotations
 
+import queue
 import socket
+import sys
 import threading
 import time
-from typing import Optional
+from typing import Optional, Tuple
 
 from robot_reloj.virtual_robot import VirtualRobotController
 
@@ -37,6 +43,8 @@ class UDPCommandServer:
         self._running = True
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._sock.bind((self.host, self.port))
+        # Timeout so stop() can join the loop and the port is freed for a re-open
+        self._sock.settimeout(0.5)
         self._th = threading.Thread(target=self._loop, daemon=True)
         self._th.start()
         print(f"UDP listening on {self.host}:{self.port}")
@@ -56,11 +64,16 @@ class UDPCommandServer:
                 except ValueError:
                     continue
                 self.controller.apply_command(values)
+            except socket.timeout:
+                continue
             except OSError:
                 break
 
     def stop(self) -> None:
         self._running = False
+        if self._th is not None:
+            self._th.join(timeout=2.0)
+            self._th = None
         try:
             if self._sock:
                 self._sock.close()
@@ -69,13 +82,14 @@ class UDPCommandServer:
         self._sock = None
 
 
-def main() -> None:
+def _open_gui() -> Tuple[VirtualRobotController, UDPCommandServer, threading.Event]:
     ctrl = VirtualRobotController(use_gui=True)
+    stop = threading.Event()
 
     # Background integrator ticking at ~60 Hz
     def tick() -> None:
         last = time.time()
-        while True:
+        while not stop.is_set():
             now = time.time()
             dt = now - last
             last = now
@@ -90,7 +104,46 @@ def main() -> None:
     # UDP command server
     udp = UDPCommandServer(ctrl)
     udp.start()
+    return ctrl, udp, stop
+
+
+def _close_gui(ctrl: VirtualRobotController, udp: UDPCommandServer, stop: threading.Event) -> None:
+    stop.set()
+    udp.stop()
+    ctrl.shutdown()
+
+
+def standby() -> None:
+    """Wait for show/hide/exit commands on stdin, keeping imports warm."""
+    cmds: "queue.Queue[str]" = queue.Queue()
+
+    def read_stdin() -> None:
+        try:
+            for line in sys.stdin:
+                cmds.put(line.strip().lower())
+        finally:
+            cmds.put("exit")
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+    gui = None
+    # The GUI stays on the main thread; stdin is read in the background
+    while True:
+        cmd = cmds.get()
+        if cmd == "show" and gui is None:
+            gui = _open_gui()
+        elif cmd in ("hide", "exit") and gui is not None:
+            _close_gui(*gui)
+            gui = None
+        if cmd == "exit":
+            break
+
+
+def main() -> None:
+    if "--standby" in sys.argv[1:]:
+        standby()
+        return
 
+    gui = _open_gui()
     print("PyBullet GUI ready. Send 24-value commands via UDP to 127.0.0.1:5556")
     print("Press Ctrl+C to exit.")
     try:
@@ -99,7 +152,7 @@ def main() -> None:
     except KeyboardInterrupt:
         pass
     finally:
-        udp.stop()
+        _close_gui(*gui)
 
 
 if __name__ == "__main__":
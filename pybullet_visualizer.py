@@ -46,6 +46,11 @@ class PyBulletVisualizer:
         self.lock = threading.Lock()
         self._last_frame: Optional[bytes] = None
         self.mimetype: str = "image/jpeg"
+        # scene_seq grows on every scene/camera change; frame_seq is the
+        # scene_seq of _last_frame. Equal values mean no re-render is needed.
+        self.scene_seq = 0
+        self.frame_seq = -1
+        self._status_key: Optional[tuple] = None
         
         # Camera parameters (configurable)
         self.camera_target = [0, 0, 0.03]
@@ -293,23 +298,34 @@ class PyBulletVisualizer:
                 self.camera_pitch = float(pitch)
             if up_axis is not None:
                 self.camera_up = int(up_axis)
+            self.scene_seq += 1
 
-    def get_camera_config(self) -> dict:
-        """Get current camera configuration."""
+    def get_camera_config(self, blocking: bool = True) -> dict:
+        """Get current camera configuration.
+
+        With blocking=False the values are read without waiting for an
+        in-progress render (each attribute is replaced atomically).
+        """
+        if not blocking:
+            return self._camera_config()
         with self.lock:
-            return {
-                "target": list(self.camera_target),
-                "distance": self.camera_distance,
-                "yaw": self.camera_yaw,
-                "pitch": self.camera_pitch,
-                "up_axis": self.camera_up
-            }
+            return self._camera_config()
+
+    def _camera_config(self) -> dict:
+        return {
+            "target": list(self.camera_target),
+            "distance": self.camera_distance,
+            "yaw": self.camera_yaw,
+            "pitch": self.camera_pitch,
+            "up_axis": self.camera_up
+        }
 
     def set_render_size(self, width: int, height: int) -> None:
         """Change render resolution."""
         with self.lock:
             self.width = max(320, min(3840, int(width)))
             self.height = max(240, min(2160, int(height)))
+            self.scene_seq += 1
 
     def _mm_to_joint(self, x_mm: float) -> float:
         # Mapping consistent with the manual slider used in the PyBullet demo
@@ -333,8 +349,18 @@ class PyBulletVisualizer:
         if math.isfinite(target_candidate) and target_candidate > 0:
             self.volume_ml_capacity = target_candidate
             target_ml = target_candidate
+        status_key = (
+            a_deg, slide_pos, vol_ml, target_ml,
+            getattr(status, "caudal_est_mls", getattr(status, "flow_est", 0.0)),
+            getattr(status, "caudalBombaMLs", None),
+        )
 
         with self.lock:
+            # Mismo estado que la última vez: la escena no cambia
+            if status_key == self._status_key:
+                return
+            self._status_key = status_key
+            self.scene_seq += 1
             if self.robot_id is not None:
                 if self._num_joints > 0 and self.angle_joint is not None and 0 <= self.angle_joint < self._num_joints:
                     try:
@@ -413,11 +439,20 @@ class PyBulletVisualizer:
         return header + dib + b''.join(rows)
 
     def render_frame(self) -> Optional[bytes]:
+        return self.render_frame_seq()[0]
+
+    def render_frame_seq(self) -> tuple[Optional[bytes], int]:
+        """Like render_frame, also returning the scene_seq the frame belongs to."""
         # Intentar adquirir lock sin bloquear para no saturar si hay updates de cámara pendientes
         if not self.lock.acquire(blocking=False):
-            return self._last_frame
+            # frame_seq antes que el frame: en carrera la etiqueta queda vieja, nunca adelantada
+            seq = self.frame_seq
+            return self._last_frame, seq
         
         try:
+            seq = self.scene_seq
+            if seq == self.frame_seq and self._last_frame:
+                return self._last_frame, seq
             view = p.computeViewMatrixFromYawPitchRoll(
                 cameraTargetPosition=self.camera_target,
                 distance=self.camera_distance,
@@ -470,10 +505,11 @@ class PyBulletVisualizer:
                     frame = self._encode_bmp(rgb_img)
                     self.mimetype = "image/bmp"
                 except Exception:
-                    frame = self._last_frame
+                    frame = None
             if frame:
                 self._last_frame = frame
-                return frame
-            return self._last_frame
+                self.frame_seq = seq
+                return frame, seq
+            return self._last_frame, self.frame_seq
         finally:
             self.lock.release()
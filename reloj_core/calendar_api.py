@@ -107,6 +107,8 @@ def register_calendar_routes(app, shared_calendar, logger):
                     "task_id": task_id,
                     "task": shared_calendar.get_task(task_id).to_dict()
                 })
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
             except Exception as e:
                 logger(f"[Calendar API] Error creando tarea: {e}")
                 return jsonify({"error": str(e)}), 500
@@ -143,6 +145,8 @@ def register_calendar_routes(app, shared_calendar, logger):
                     "status": "ok",
                     "task": shared_calendar.get_task(task_id).to_dict()
                 })
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
             except Exception as e:
                 logger(f"[Calendar API] Error actualizando tarea: {e}")
                 return jsonify({"error": str(e)}), 500
@@ -15,14 +15,60 @@ Similar al sistema de actuadores compartidos, este calendario permite
 que todos los robots accedan al mismo conjunto de tareas programadas.
 """
 
+import atexit
 import json
+import os
 import threading
 import time
-from datetime import datetime, timedelta, date
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, date, time as dtime
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Callable
-from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Any, Callable
+from dataclasses import dataclass, field, asdict, replace
 from enum import Enum
+from types import MappingProxyType
+
+import numpy as np
+
+try:
+    import orjson  # Serialización JSON en C (opcional)
+except ImportError:
+    orjson = None
+
+# Intervalo de revisión de cambios pendientes (segundos)
+SAVE_INTERVAL_SECONDS = 2.0
+# Compactación del journal: cada N segundos o al superar N entradas
+COMPACT_INTERVAL_SECONDS = 300
+COMPACT_MAX_ENTRIES = 1000
+# Vigencia de las vistas día/semana/mes cacheadas (segundos)
+VIEW_CACHE_TTL_SECONDS = 15.0
+# Intervalo de limpieza de tareas antiguas (segundos)
+CLEANUP_INTERVAL_SECONDS = 3600
+
+# Origen para los timestamps de hora local (naive) usados en el índice temporal
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _local_ts(value: datetime) -> float:
+    """Segundos desde _EPOCH de un datetime naive (sin conversión de zona)"""
+    return (value - _EPOCH).total_seconds()
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serializa a JSON UTF-8 usando orjson si está disponible"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    text = json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+    return text.encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """Deserializa JSON usando orjson si está disponible"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 # =============================================================================
 # TIPOS Y CLASES DE DATOS
@@ -45,9 +91,13 @@ class TaskState(Enum):
     CANCELLED = "cancelada"    # Cancelada por el usuario
     EXPIRED = "expirada"       # No ejecutada antes de deadline
 
-@dataclass
+# Conjuntos de estados (frozenset: pertenencia O(1) sin crear listas por iteración)
+_PENDING_STATES = frozenset({TaskState.PENDING.value, TaskState.SCHEDULED.value})
+_TERMINAL_STATES = frozenset({TaskState.COMPLETED.value, TaskState.FAILED.value, TaskState.CANCELLED.value})
+
+@dataclass(slots=True)
 class CalendarTask:
-    """Tarea en el calendario compartido"""
+    """Tarea en el calendario compartido (con __slots__: sin __dict__ por instancia)"""
     # Campos requeridos (sin valores por defecto) - DEBEN IR PRIMERO
     id: str
     title: str
@@ -77,6 +127,12 @@ class CalendarTask:
     result: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
     
+    # Campos internos (no se serializan)
+    _cached_dict: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    _start_dt: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    _start_date: Optional[date] = field(default=None, init=False, repr=False, compare=False)
+    _start_ts: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         if not self.created_at:
             self.created_at = datetime.now().isoformat()
@@ -84,10 +140,31 @@ class CalendarTask:
             self.updated_at = self.created_at
         if not self.next_execution and self.start_datetime:
             self.next_execution = self.start_datetime
+        self._refresh_derived()
+    
+    def _refresh_derived(self):
+        """Recalcula los campos internos tras modificar la tarea"""
+        self._cached_dict = None
+        try:
+            start = datetime.fromisoformat(self.start_datetime)
+        except (TypeError, ValueError):
+            # Fecha inválida: la tarea queda fuera de los filtros por fecha
+            self._start_dt = None
+            self._start_date = None
+            self._start_ts = None
+            return
+        if start.tzinfo is not None:
+            # Normalizar a hora local naive para poder comparar con datetime.now()
+            start = start.astimezone().replace(tzinfo=None)
+        self._start_dt = start
+        self._start_date = start.date()
+        self._start_ts = _local_ts(start)
 
     def to_dict(self) -> Dict[str, Any]:
-        """Convierte a diccionario"""
-        return asdict(self)
+        """Convierte a diccionario (memoizado: el resultado no debe modificarse)"""
+        if self._cached_dict is None:
+            self._cached_dict = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        return self._cached_dict
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "CalendarTask":
@@ -107,29 +184,68 @@ class SharedCalendar:
     - Filtrado por robot, prioridad, estado
     - Vistas de calendario: día, semana, mes
     - Sincronización automática
-    - Persistencia en JSON
+    - Persistencia en JSON (snapshot + journal incremental)
+    
+    Las lecturas no toman ningún lock: ``_tasks`` es un snapshot inmutable
+    que los escritores reemplazan completo (copy-on-write) bajo
+    ``_write_lock``. Las tareas publicadas no se modifican en sitio.
     """
     
     def __init__(self, data_dir: Path, logger: Optional[Callable] = None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.calendar_file = self.data_dir / "shared_calendar.json"
+        self.journal_file = self.data_dir / "shared_calendar.log"
         self.logger = logger or print
         
         # Estado interno
-        self._lock = threading.RLock()
-        self._tasks: Dict[str, CalendarTask] = {}
+        self._write_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._tasks: Mapping[str, CalendarTask] = MappingProxyType({})
+        # Índice temporal (snapshot, timestamps ordenados, tareas alineadas)
+        self._time_index: Optional[Tuple[Mapping[str, CalendarTask], np.ndarray, List[CalendarTask]]] = None
         self._task_counter = 0
+        self._dirty = False
+        self._last_save = time.time()
+        self._journal_entries = 0
+        self._journal_synced = True
+        
+        # Cache de vistas: clave -> (timestamp, primer día, último día, vista)
+        self._view_cache: Dict[Tuple, Tuple[float, date, date, Dict[str, Any]]] = {}
+        self._view_lock = threading.Lock()
+        self._view_generation = 0
         
-        # Callbacks para notificar cambios
+        # Callbacks para notificar cambios (se ejecutan fuera del hilo que escribe;
+        # un único worker conserva el orden de los eventos)
         self._change_callbacks: List[Callable] = []
+        self._cb_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cal-cb')
         
-        # Cargar tareas existentes
+        # Cargar tareas existentes (snapshot + journal)
         self._load_calendar()
+        self._journal_fh = open(self.journal_file, 'ab', buffering=0)
+        if self._dirty:
+            # Consolidar el journal heredado (descarta líneas truncadas)
+            self._compact()
         
         # Iniciar thread de limpieza y verificación
+        self._stop_event = threading.Event()
         self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
         self._cleanup_thread.start()
+        
+        # Volcar cambios pendientes al salir
+        atexit.register(self.close)
+    
+    def close(self):
+        """Detiene el thread de mantenimiento y consolida los cambios pendientes"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        if self._cleanup_thread is not threading.current_thread():
+            self._cleanup_thread.join()
+        self._flush()
+        self._journal_fh.close()
+        self._cb_pool.shutdown(wait=True)
+        atexit.unregister(self.close)
     
     # -------------------------------------------------------------------------
     # CRUD de Tareas
@@ -137,59 +253,149 @@ class SharedCalendar:
     
     def add_task(self, task: CalendarTask) -> str:
         """Agrega una tarea al calendario"""
-        with self._lock:
-            if not task.id:
-                self._task_counter += 1
-                task.id = f"task_{int(time.time())}_{self._task_counter:04d}"
-            
-            task.updated_at = datetime.now().isoformat()
-            self._tasks[task.id] = task
-            self._save_calendar()
+        with self._write_lock:
+            tasks = dict(self._tasks)
+            changed: List[CalendarTask] = []
+            task_id = self._insert_task(tasks, task, changed)
+            self._publish(tasks, changed)
+            self._journal([self._journal_line("add", task)])
+        
+        self._notify_change("task_added", task)
+        self.logger(f"[SharedCalendar] Tarea agregada: {task.title} ({task.id})")
+        return task_id
+    
+    def add_tasks(self, tasks: List[CalendarTask]) -> List[str]:
+        """Agrega varias tareas de una vez (una sola escritura al journal)"""
+        with self._write_lock:
+            new_tasks = dict(self._tasks)
+            changed: List[CalendarTask] = []
+            task_ids = [self._insert_task(new_tasks, task, changed) for task in tasks]
+            self._publish(new_tasks, changed)
+            self._journal([self._journal_line("add", task) for task in tasks])
+        
+        for task in tasks:
             self._notify_change("task_added", task)
-            
-            self.logger(f"[SharedCalendar] Tarea agregada: {task.title} ({task.id})")
-            return task.id
+        self.logger(f"[SharedCalendar] {len(task_ids)} tareas agregadas")
+        return task_ids
+    
+    def _insert_task(self, tasks: Dict[str, CalendarTask], task: CalendarTask,
+                     changed: List[CalendarTask]) -> str:
+        """Asigna ID y registra la tarea en ``tasks`` (requiere el write lock).
+
+        Agrega a ``changed`` la tarea y, si reemplaza una existente, la versión
+        previa, para invalidar también las vistas de su fecha anterior.
+        """
+        prev = tasks.get(task.id) if task.id else None
+        if prev is task:
+            # Misma instancia re-agregada: conservar la fecha derivada anterior
+            prev = replace(prev)
+            prev._start_date = task._start_date
+        task._refresh_derived()
+        if task._start_dt is None:
+            raise ValueError(f"start_datetime inválido: {task.start_datetime!r}")
+        if not task.id:
+            self._task_counter += 1
+            task.id = f"task_{int(time.time())}_{self._task_counter:04d}"
+        
+        task.updated_at = datetime.now().isoformat()
+        if prev is not None:
+            changed.append(prev)
+        changed.append(task)
+        tasks[task.id] = task
+        return task.id
     
     def update_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
         """Actualiza una tarea existente"""
-        with self._lock:
+        with self._write_lock:
             if task_id not in self._tasks:
                 return False
             
-            task = self._tasks[task_id]
+            # Copia: los lectores pueden seguir usando la versión publicada
+            old_task = self._tasks[task_id]
+            task = replace(old_task)
             for key, value in updates.items():
                 if hasattr(task, key):
                     setattr(task, key, value)
             
             task.updated_at = datetime.now().isoformat()
-            self._save_calendar()
-            self._notify_change("task_updated", task)
-            
-            self.logger(f"[SharedCalendar] Tarea actualizada: {task.title}")
-            return True
+            task._refresh_derived()
+            if task._start_dt is None:
+                raise ValueError(f"start_datetime inválido: {task.start_datetime!r}")
+            tasks = dict(self._tasks)
+            tasks[task_id] = task
+            self._publish(tasks, [old_task, task])
+            self._journal([self._journal_line("upd", task)])
+        
+        self._notify_change("task_updated", task)
+        self.logger(f"[SharedCalendar] Tarea actualizada: {task.title}")
+        return True
     
     def delete_task(self, task_id: str) -> bool:
         """Elimina una tarea del calendario"""
-        with self._lock:
+        with self._write_lock:
             if task_id not in self._tasks:
                 return False
             
-            task = self._tasks.pop(task_id)
-            self._save_calendar()
-            self._notify_change("task_deleted", task)
-            
-            self.logger(f"[SharedCalendar] Tarea eliminada: {task.title}")
-            return True
+            tasks = dict(self._tasks)
+            task = tasks.pop(task_id)
+            self._publish(tasks, [task])
+            self._journal([self._journal_line("del", task)])
+        
+        self._notify_change("task_deleted", task)
+        self.logger(f"[SharedCalendar] Tarea eliminada: {task.title}")
+        return True
+    
+    def _publish(self, tasks: Dict[str, CalendarTask], changed: Iterable[CalendarTask] = ()):
+        """Publica un nuevo snapshot de tareas (requiere el write lock)"""
+        self._tasks = MappingProxyType(tasks)
+        self._invalidate_views(changed)
+    
+    # -------------------------------------------------------------------------
+    # Cache de vistas
+    # -------------------------------------------------------------------------
+    
+    def _cached_view(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Devuelve una vista cacheada si sigue vigente"""
+        entry = self._view_cache.get(key)
+        if entry is None or time.time() - entry[0] >= VIEW_CACHE_TTL_SECONDS:
+            return None
+        return entry[3]
+    
+    def _store_view(self, key: Tuple, generation: int, first_day: date, last_day: date,
+                    view: Dict[str, Any]) -> Dict[str, Any]:
+        """Guarda una vista salvo que haya habido escrituras mientras se construía"""
+        with self._view_lock:
+            if generation == self._view_generation:
+                self._view_cache[key] = (time.time(), first_day, last_day, view)
+        return view
+    
+    def _invalidate_views(self, changed: Iterable[CalendarTask]):
+        """Descarta las vistas cuyo rango de fechas incluye alguna tarea modificada"""
+        days = set()
+        invalidate_all = False
+        for task in changed:
+            if task._start_date is None:
+                invalidate_all = True
+            else:
+                days.add(task._start_date)
+        
+        with self._view_lock:
+            self._view_generation += 1
+            if invalidate_all:
+                self._view_cache.clear()
+                return
+            stale = [key for key, (_, first_day, last_day, _) in self._view_cache.items()
+                     if any(first_day <= day <= last_day for day in days)]
+            for key in stale:
+                del self._view_cache[key]
     
     def get_task(self, task_id: str) -> Optional[CalendarTask]:
         """Obtiene una tarea por ID"""
-        with self._lock:
-            return self._tasks.get(task_id)
+        return self._tasks.get(task_id)
     
     def get_all_tasks(self) -> List[CalendarTask]:
         """Obtiene todas las tareas"""
-        with self._lock:
-            return list(self._tasks.values())
+        return list(self._tasks.values())
     
     # -------------------------------------------------------------------------
     # Filtros y Vistas
@@ -197,59 +403,66 @@ class SharedCalendar:
     
     def get_tasks_by_robot(self, robot_id: str) -> List[CalendarTask]:
         """Obtiene tareas de un robot específico"""
-        with self._lock:
-            return [t for t in self._tasks.values() if t.robot_id == robot_id]
+        return [t for t in self._tasks.values() if t.robot_id == robot_id]
     
     def get_tasks_by_date(self, target_date: date) -> List[CalendarTask]:
         """Obtiene tareas para una fecha específica"""
-        with self._lock:
-            tasks = []
-            for task in self._tasks.values():
-                try:
-                    task_date = datetime.fromisoformat(task.start_datetime).date()
-                    if task_date == target_date:
-                        tasks.append(task)
-                except:
-                    continue
-            return tasks
+        return self.get_tasks_by_date_range(target_date, target_date)
     
     def get_tasks_by_date_range(self, start_date: date, end_date: date) -> List[CalendarTask]:
-        """Obtiene tareas en un rango de fechas"""
-        with self._lock:
-            tasks = []
-            for task in self._tasks.values():
-                try:
-                    task_date = datetime.fromisoformat(task.start_datetime).date()
-                    if start_date <= task_date <= end_date:
-                        tasks.append(task)
-                except:
-                    continue
-            return tasks
+        """Obtiene tareas en un rango de fechas (ordenadas por inicio)"""
+        _, timestamps, ordered = self._get_time_index()
+        lo = _local_ts(datetime.combine(start_date, dtime.min))
+        hi = _local_ts(datetime.combine(end_date + timedelta(days=1), dtime.min))
+        first, last = np.searchsorted(timestamps, (lo, hi), side='left')
+        return ordered[first:last]
+    
+    def _get_time_index(self) -> Tuple[Mapping[str, CalendarTask], np.ndarray, List[CalendarTask]]:
+        """
+        Devuelve el índice temporal del snapshot actual, reconstruyéndolo si
+        hubo escrituras desde la última consulta.
+        
+        Los timestamps se guardan en un ndarray contiguo (float64) ordenado,
+        alineado con la lista de tareas, para filtrar rangos con búsqueda
+        binaria en lugar de recorrer todas las tareas en Python.
+        """
+        tasks = self._tasks
+        index = self._time_index
+        if index is not None and index[0] is tasks:
+            return index
+        
+        ordered = sorted((t for t in tasks.values() if t._start_ts is not None),
+                         key=lambda t: t._start_ts)
+        timestamps = np.fromiter((t._start_ts for t in ordered), dtype=np.float64, count=len(ordered))
+        index = (tasks, timestamps, ordered)
+        self._time_index = index
+        return index
     
     def get_day_view(self, target_date: Optional[date] = None) -> Dict[str, Any]:
         """Vista del calendario para un día"""
         if target_date is None:
             target_date = date.today()
         
+        key = ("day", target_date)
+        cached = self._cached_view(key)
+        if cached is not None:
+            return cached
+        generation = self._view_generation
+        
         tasks = self.get_tasks_by_date(target_date)
+        task_dicts = [t.to_dict() for t in tasks]
         
-        # Organizar por hora
-        tasks_by_hour = {}
-        for task in tasks:
-            try:
-                hour = datetime.fromisoformat(task.start_datetime).hour
-                if hour not in tasks_by_hour:
-                    tasks_by_hour[hour] = []
-                tasks_by_hour[hour].append(task)
-            except:
-                continue
+        # Organizar por hora (reutilizando los mismos diccionarios)
+        tasks_by_hour = defaultdict(list)
+        for task, task_dict in zip(tasks, task_dicts):
+            tasks_by_hour[task._start_dt.hour].append(task_dict)
         
-        return {
+        return self._store_view(key, generation, target_date, target_date, {
             "date": target_date.isoformat(),
             "total_tasks": len(tasks),
-            "tasks_by_hour": tasks_by_hour,
-            "tasks": [t.to_dict() for t in tasks]
-        }
+            "tasks_by_hour": dict(tasks_by_hour),
+            "tasks": task_dicts
+        })
     
     def get_week_view(self, target_date: Optional[date] = None) -> Dict[str, Any]:
         """Vista del calendario para una semana"""
@@ -260,30 +473,30 @@ class SharedCalendar:
         start_of_week = target_date - timedelta(days=target_date.weekday())
         end_of_week = start_of_week + timedelta(days=6)
         
+        key = ("week", start_of_week)
+        cached = self._cached_view(key)
+        if cached is not None:
+            return cached
+        generation = self._view_generation
+        
         tasks = self.get_tasks_by_date_range(start_of_week, end_of_week)
         
         # Organizar por día
-        tasks_by_day = {}
-        for i in range(7):
-            day = start_of_week + timedelta(days=i)
-            tasks_by_day[day.isoformat()] = []
+        tasks_by_day = self._empty_day_buckets(start_of_week, end_of_week)
         
-        for task in tasks:
-            try:
-                task_date = datetime.fromisoformat(task.start_datetime).date()
-                day_key = task_date.isoformat()
-                if day_key in tasks_by_day:
-                    tasks_by_day[day_key].append(task)
-            except:
-                continue
+        task_dicts = [t.to_dict() for t in tasks]
+        for task, task_dict in zip(tasks, task_dicts):
+            day_key = task._start_date.isoformat()
+            if day_key in tasks_by_day:
+                tasks_by_day[day_key].append(task_dict)
         
-        return {
+        return self._store_view(key, generation, start_of_week, end_of_week, {
             "start_date": start_of_week.isoformat(),
             "end_date": end_of_week.isoformat(),
             "total_tasks": len(tasks),
-            "tasks_by_day": {k: [t.to_dict() for t in v] for k, v in tasks_by_day.items()},
-            "tasks": [t.to_dict() for t in tasks]
-        }
+            "tasks_by_day": tasks_by_day,
+            "tasks": task_dicts
+        })
     
     def get_month_view(self, year: int, month: int) -> Dict[str, Any]:
         """Vista del calendario para un mes"""
@@ -294,74 +507,73 @@ class SharedCalendar:
         else:
             last_day = date(year, month + 1, 1) - timedelta(days=1)
         
+        key = ("month", year, month)
+        cached = self._cached_view(key)
+        if cached is not None:
+            return cached
+        generation = self._view_generation
+        
         tasks = self.get_tasks_by_date_range(first_day, last_day)
         
         # Organizar por día
-        tasks_by_day = {}
-        current_day = first_day
-        while current_day <= last_day:
-            tasks_by_day[current_day.isoformat()] = []
-            current_day += timedelta(days=1)
+        tasks_by_day = self._empty_day_buckets(first_day, last_day)
         
-        for task in tasks:
-            try:
-                task_date = datetime.fromisoformat(task.start_datetime).date()
-                day_key = task_date.isoformat()
-                if day_key in tasks_by_day:
-                    tasks_by_day[day_key].append(task)
-            except:
-                continue
+        task_dicts = [t.to_dict() for t in tasks]
+        for task, task_dict in zip(tasks, task_dicts):
+            day_key = task._start_date.isoformat()
+            if day_key in tasks_by_day:
+                tasks_by_day[day_key].append(task_dict)
         
-        return {
+        return self._store_view(key, generation, first_day, last_day, {
             "year": year,
             "month": month,
             "start_date": first_day.isoformat(),
             "end_date": last_day.isoformat(),
             "total_tasks": len(tasks),
-            "tasks_by_day": {k: [t.to_dict() for t in v] for k, v in tasks_by_day.items()},
-            "tasks": [t.to_dict() for t in tasks]
-        }
+            "tasks_by_day": tasks_by_day,
+            "tasks": task_dicts
+        })
+    
+    @staticmethod
+    def _empty_day_buckets(first_day: date, last_day: date) -> Dict[str, List[Dict[str, Any]]]:
+        """Crea {fecha ISO: []} para cada día del rango (ambos incluidos)"""
+        base = first_day.toordinal()
+        return {date.fromordinal(base + i).isoformat(): []
+                for i in range(last_day.toordinal() - base + 1)}
     
     def get_upcoming_tasks(self, limit: int = 10) -> List[CalendarTask]:
         """Obtiene las próximas tareas a ejecutar"""
-        with self._lock:
-            now = datetime.now()
-            upcoming = []
-            
-            for task in self._tasks.values():
-                if task.state in [TaskState.PENDING.value, TaskState.SCHEDULED.value]:
-                    try:
-                        task_time = datetime.fromisoformat(task.start_datetime)
-                        if task_time > now:
-                            upcoming.append((task_time, task))
-                    except:
-                        continue
-            
-            # Ordenar por fecha
-            upcoming.sort(key=lambda x: x[0])
-            return [task for _, task in upcoming[:limit]]
+        _, timestamps, ordered = self._get_time_index()
+        upcoming = []
+        if limit <= 0:
+            return upcoming
+        
+        # El índice ya está ordenado: saltar al primer inicio posterior a
+        # ahora y recorrer solo hasta reunir `limit` tareas pendientes
+        first = int(np.searchsorted(timestamps, _local_ts(datetime.now()), side='right'))
+        for i in range(first, len(ordered)):
+            task = ordered[i]
+            if task.state in _PENDING_STATES:
+                upcoming.append(task)
+                if len(upcoming) >= limit:
+                    break
+        return upcoming
     
     def get_tasks_by_state(self, state: TaskState) -> List[CalendarTask]:
         """Obtiene tareas por estado"""
-        with self._lock:
-            return [t for t in self._tasks.values() if t.state == state.value]
+        return [t for t in self._tasks.values() if t.state == state.value]
     
     def get_overdue_tasks(self) -> List[CalendarTask]:
         """Obtiene tareas vencidas (no ejecutadas después de su hora)"""
-        with self._lock:
-            now = datetime.now()
-            overdue = []
-            
-            for task in self._tasks.values():
-                if task.state in [TaskState.PENDING.value, TaskState.SCHEDULED.value]:
-                    try:
-                        task_time = datetime.fromisoformat(task.start_datetime)
-                        if task_time < now:
-                            overdue.append(task)
-                    except:
-                        continue
-            
-            return overdue
+        now = datetime.now()
+        overdue = []
+        
+        for task in self._tasks.values():
+            if task.state in _PENDING_STATES:
+                if task._start_dt is not None and task._start_dt < now:
+                    overdue.append(task)
+        
+        return overdue
     
     # -------------------------------------------------------------------------
     # Estadísticas
@@ -369,72 +581,178 @@ class SharedCalendar:
     
     def get_statistics(self) -> Dict[str, Any]:
         """Obtiene estadísticas del calendario"""
-        with self._lock:
-            total = len(self._tasks)
-            by_state = {}
-            by_robot = {}
-            by_priority = {}
-            
-            for task in self._tasks.values():
-                # Por estado
-                state = task.state
-                by_state[state] = by_state.get(state, 0) + 1
-                
-                # Por robot
-                robot = task.robot_id
-                by_robot[robot] = by_robot.get(robot, 0) + 1
-                
-                # Por prioridad
-                priority = task.priority
-                by_priority[priority] = by_priority.get(priority, 0) + 1
-            
-            return {
-                "total_tasks": total,
-                "by_state": by_state,
-                "by_robot": by_robot,
-                "by_priority": by_priority,
-                "upcoming_count": len(self.get_upcoming_tasks()),
-                "overdue_count": len(self.get_overdue_tasks())
-            }
+        tasks = self._tasks
+        
+        return {
+            "total_tasks": len(tasks),
+            "by_state": dict(Counter(t.state for t in tasks.values())),
+            "by_robot": dict(Counter(t.robot_id for t in tasks.values())),
+            "by_priority": dict(Counter(t.priority for t in tasks.values())),
+            "upcoming_count": len(self.get_upcoming_tasks()),
+            "overdue_count": len(self.get_overdue_tasks())
+        }
     
     # -------------------------------------------------------------------------
     # Persistencia
     # -------------------------------------------------------------------------
     
-    def _save_calendar(self):
-        """Guarda el calendario en disco"""
+    def _save_calendar(self, tasks: Mapping[str, CalendarTask]) -> bool:
+        """Guarda un snapshot en disco de forma atómica (temporal + os.replace)"""
         try:
             data = {
                 "version": "1.0",
                 "updated_at": datetime.now().isoformat(),
-                "tasks": {task_id: task.to_dict() for task_id, task in self._tasks.items()}
+                "tasks": {task_id: task.to_dict() for task_id, task in tasks.items()}
             }
+            payload = _json_dumps(data, indent=True)
             
-            with open(self.calendar_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            tmp_file = self.calendar_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.calendar_file)
+            return True
         except Exception as e:
             self.logger(f"[SharedCalendar] Error guardando calendario: {e}")
+            return False
     
-    def _load_calendar(self):
-        """Carga el calendario desde disco"""
+    @staticmethod
+    def _journal_line(op: str, task: CalendarTask) -> bytes:
+        """Serializa una mutación como una línea del journal"""
+        if op == "del":
+            entry = {"op": op, "id": task.id}
+        else:
+            entry = {"op": op, "task": task.to_dict()}
+        return _json_dumps(entry) + b"\n"
+    
+    def _journal(self, lines: List[bytes]):
+        """Añade mutaciones al journal (requiere el write lock)"""
+        if not lines:
+            return
         try:
-            if not self.calendar_file.exists():
-                self.logger("[SharedCalendar] No hay calendario previo, iniciando nuevo")
-                return
+            self._journal_fh.write(b"".join(lines))
+        except Exception as e:
+            self.logger(f"[SharedCalendar] Error escribiendo journal: {e}")
+        self._journal_entries += len(lines)
+        self._journal_synced = False
+        self._dirty = True
+    
+    def _replay_journal(self, tasks: Dict[str, CalendarTask]) -> int:
+        """Aplica sobre ``tasks`` las mutaciones registradas en el journal"""
+        if not self.journal_file.exists():
+            return 0
+        
+        applied = 0
+        with open(self.journal_file, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = _json_loads(line)
+                    if entry["op"] == "del":
+                        tasks.pop(entry["id"], None)
+                    else:
+                        task = CalendarTask.from_dict(entry["task"])
+                        tasks[task.id] = task
+                    applied += 1
+                except Exception as e:
+                    # Una línea truncada (p. ej. por un corte) no invalida el resto
+                    self.logger(f"[SharedCalendar] Entrada de journal inválida (línea {line_no}): {e}")
+        return applied
+    
+    def _compact(self):
+        """
+        Reescribe el snapshot completo y descarta del journal lo ya consolidado.
+        
+        El snapshot se serializa y escribe fuera del write lock; las
+        mutaciones que lleguen mientras tanto se conservan en el journal.
+        """
+        with self._compact_lock:
+            with self._write_lock:
+                if not self._dirty:
+                    return
+                tasks = self._tasks
+                offset = self._journal_fh.tell()
+                entries = self._journal_entries
             
-            with open(self.calendar_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if not self._save_calendar(tasks):
+                # Sin snapshot nuevo el journal sigue siendo la única copia
+                return
             
-            tasks_data = data.get("tasks", {})
-            for task_id, task_dict in tasks_data.items():
+            with self._write_lock:
                 try:
-                    self._tasks[task_id] = CalendarTask.from_dict(task_dict)
+                    with open(self.journal_file, 'rb') as f:
+                        f.seek(offset)
+                        pending = f.read()
+                    tmp_file = self.journal_file.with_suffix('.log.tmp')
+                    with open(tmp_file, 'wb') as f:
+                        f.write(pending)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_file, self.journal_file)
+                    self._journal_fh.close()
+                    self._journal_fh = open(self.journal_file, 'ab', buffering=0)
                 except Exception as e:
-                    self.logger(f"[SharedCalendar] Error cargando tarea {task_id}: {e}")
-            
-            self.logger(f"[SharedCalendar] Cargadas {len(self._tasks)} tareas")
+                    self.logger(f"[SharedCalendar] Error vaciando journal: {e}")
+                    return
+                self._journal_entries -= entries
+                self._journal_synced = not pending
+                self._dirty = bool(pending)
+                self._last_save = time.time()
+    
+    def _flush(self):
+        """Compacta el journal solo si hay cambios pendientes"""
+        if self._dirty:
+            self._compact()
+    
+    def _maybe_compact(self):
+        """Compacta si el journal es grande o lleva tiempo sin compactarse"""
+        if not self._dirty:
+            return
+        if (self._journal_entries >= COMPACT_MAX_ENTRIES
+                or time.time() - self._last_save >= COMPACT_INTERVAL_SECONDS):
+            self._compact()
+            return
+        if not self._journal_synced:
+            # fsync agrupado: una vez por ciclo, no por mutación. Se marca antes
+            # para que una escritura concurrente vuelva a dejarlo pendiente.
+            self._journal_synced = True
+            try:
+                os.fsync(self._journal_fh.fileno())
+            except Exception as e:
+                self._journal_synced = False
+                self.logger(f"[SharedCalendar] Error sincronizando journal: {e}")
+    
+    def _load_calendar(self):
+        """Carga el calendario desde disco"""
+        tasks: Dict[str, CalendarTask] = {}
+        try:
+            if self.calendar_file.exists():
+                tasks_data = _json_loads(self.calendar_file.read_bytes()).get("tasks", {})
+                
+                # Consumir el árbol JSON a medida que se convierte, para que
+                # el pico de memoria no sea diccionarios + objetos completos
+                for task_id in list(tasks_data):
+                    task_dict = tasks_data.pop(task_id)
+                    try:
+                        tasks[task_id] = CalendarTask.from_dict(task_dict)
+                    except Exception as e:
+                        self.logger(f"[SharedCalendar] Error cargando tarea {task_id}: {e}")
+            elif not self.journal_file.exists():
+                self.logger("[SharedCalendar] No hay calendario previo, iniciando nuevo")
+                return
         except Exception as e:
             self.logger(f"[SharedCalendar] Error cargando calendario: {e}")
+        
+        try:
+            if self._replay_journal(tasks):
+                self._dirty = True
+        except Exception as e:
+            self.logger(f"[SharedCalendar] Error leyendo journal: {e}")
+        
+        self._publish(tasks)
+        self.logger(f"[SharedCalendar] Cargadas {len(tasks)} tareas")
     
     # -------------------------------------------------------------------------
     # Callbacks y Notificaciones
@@ -442,57 +760,69 @@ class SharedCalendar:
     
     def register_callback(self, callback: Callable):
         """Registra un callback para cambios en el calendario"""
-        with self._lock:
+        with self._write_lock:
             if callback not in self._change_callbacks:
-                self._change_callbacks.append(callback)
+                self._change_callbacks = self._change_callbacks + [callback]
     
     def unregister_callback(self, callback: Callable):
         """Elimina un callback"""
-        with self._lock:
+        with self._write_lock:
             if callback in self._change_callbacks:
-                self._change_callbacks.remove(callback)
+                self._change_callbacks = [cb for cb in self._change_callbacks if cb != callback]
     
     def _notify_change(self, event_type: str, task: CalendarTask):
-        """Notifica cambios a los callbacks registrados"""
+        """Notifica cambios a los callbacks registrados (de forma asíncrona)"""
         for callback in self._change_callbacks:
             try:
-                callback(event_type, task)
-            except Exception as e:
-                self.logger(f"[SharedCalendar] Error en callback: {e}")
+                self._cb_pool.submit(self._safe_call, callback, event_type, task)
+            except RuntimeError:
+                # Pool cerrado (close() ya llamado): notificar en línea
+                self._safe_call(callback, event_type, task)
+    
+    def _safe_call(self, callback: Callable, event_type: str, task: CalendarTask):
+        """Ejecuta un callback registrando sus errores"""
+        try:
+            callback(event_type, task)
+        except Exception as e:
+            self.logger(f"[SharedCalendar] Error en callback: {e}")
     
     # -------------------------------------------------------------------------
     # Limpieza automática
     # -------------------------------------------------------------------------
     
     def _cleanup_loop(self):
-        """Loop de limpieza automática de tareas antiguas"""
-        while True:
+        """Loop de compactación del journal y limpieza automática de tareas antiguas"""
+        next_cleanup = time.monotonic() + CLEANUP_INTERVAL_SECONDS
+        # wait() devuelve True en cuanto close() activa el evento
+        while not self._stop_event.wait(SAVE_INTERVAL_SECONDS):
             try:
-                time.sleep(3600)  # Cada hora
-                self._cleanup_old_tasks()
+                self._maybe_compact()
+                if time.monotonic() >= next_cleanup:
+                    next_cleanup += CLEANUP_INTERVAL_SECONDS
+                    self._cleanup_old_tasks()
             except Exception as e:
                 self.logger(f"[SharedCalendar] Error en limpieza: {e}")
     
     def _cleanup_old_tasks(self, days: int = 30):
         """Elimina tareas completadas más antiguas que X días"""
-        with self._lock:
+        with self._write_lock:
             cutoff_date = datetime.now() - timedelta(days=days)
             to_delete = []
             
             for task_id, task in self._tasks.items():
-                if task.state in [TaskState.COMPLETED.value, TaskState.FAILED.value, TaskState.CANCELLED.value]:
+                if task.state in _TERMINAL_STATES:
                     try:
                         task_date = datetime.fromisoformat(task.updated_at)
-                        if task_date < cutoff_date:
-                            to_delete.append(task_id)
-                    except:
+                    except (TypeError, ValueError):
                         continue
-            
-            for task_id in to_delete:
-                del self._tasks[task_id]
+                    if task_date < cutoff_date:
+                        to_delete.append(task_id)
             
             if to_delete:
-                self._save_calendar()
+                tasks = dict(self._tasks)
+                removed = [tasks.pop(task_id) for task_id in to_delete]
+                self._publish(tasks, removed)
+                self._journal([self._journal_line("del", task) for task in removed])
                 self.logger(f"[SharedCalendar] Limpiadas {len(to_delete)} tareas antiguas")
 
 
@@ -501,16 +831,20 @@ class SharedCalendar:
 # =============================================================================
 
 _global_calendar: Optional[SharedCalendar] = None
+_global_calendar_lock = threading.Lock()
 
 
 def get_shared_calendar(data_dir: Optional[Path] = None, logger: Optional[Callable] = None) -> SharedCalendar:
     """Obtiene o crea la instancia global del calendario compartido"""
     global _global_calendar
     
+    # Doble comprobación: sin lock en el camino habitual, con lock al crear
     if _global_calendar is None:
-        if data_dir is None:
-            # Usar directorio por defecto
-            data_dir = Path(__file__).parent / "data"
-        _global_calendar = SharedCalendar(data_dir, logger)
+        with _global_calendar_lock:
+            if _global_calendar is None:
+                if data_dir is None:
+                    # Usar directorio por defecto
+                    data_dir = Path(__file__).parent / "data"
+                _global_calendar = SharedCalendar(data_dir, logger)
     
     return _global_calendar
@@ -1,6 +1,27 @@
+"""
+Entorno Gym del robot sobre puerto serie.
+
+Formato de comandos periódicos (``wire_format``):
+
+- ``'json'`` (por defecto, el que entiende el firmware actual): una línea
+  ``{"actuadores": {...}}`` terminada en ``\n``.
+- ``'binary'`` (firmware con soporte binario): trama fija de 63 bytes,
+  little-endian, ``_CMD_STRUCT = '<B12fB3fB'``::
+
+      B    0xA5 (sincronismo)
+      3f   setpoint_corredera, setpoint_angle, setpoint_water
+      9f   pid_corredera[3], pid_angle[3], pid_valvula[3]
+      B    manual_mode
+      3f   energia_motor_corredera, energia_motor_angulo, energia_motor_valvula
+      B    calibrating
+"""
+
+import io
 import numpy as np
 import json
 import queue
+import struct
+import sys
 import threading
 import time
 import serial
@@ -8,13 +29,117 @@ import gym
 from collections import deque
 from gym import spaces
 
+try:
+    import orjson  # Serialización JSON en C (opcional)
+except ImportError:
+    orjson = None
+
+# Capacidad del historial de pasos (buffer circular)
+MEMORY_SIZE = 1000
+
+# Trazas de tráfico serie: cola acotada que un hilo vuelca a consola cada 100 ms
+LOG_QUEUE_SIZE = 1000
+LOG_FLUSH_INTERVAL = 0.1
+
+# Tamaño del buffer de lectura serie (varias tramas de telemetría)
+SERIAL_READ_BUFFER = 4096
+
+# Hilo único de E/S: timeout corto de lectura para no retrasar el envío periódico
+SERIAL_READ_TIMEOUT = 0.05
+SEND_INTERVAL = 0.3
+
+# Trama binaria de comando (ver docstring del módulo)
+_CMD_SYNC = 0xA5
+_CMD_STRUCT = struct.Struct('<B12fB3fB')
+
+
+def _json_dumps(obj):
+    """Serializa a bytes JSON usando orjson si está disponible"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def _json_loads(data):
+    """Deserializa JSON (str o bytes) usando orjson si está disponible.
+
+    orjson.JSONDecodeError hereda de json.JSONDecodeError, así que los
+    llamadores capturan el mismo tipo en ambos casos.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _SerialRaw(io.RawIOBase):
+    """Adaptador crudo sobre pyserial para io.BufferedReader.
+
+    readinto entrega lo que ya está en el buffer del SO (mínimo 1 byte, con el
+    timeout del puerto) en vez de esperar a llenar todo el buffer.
+    """
+
+    def __init__(self, ser):
+        self._ser = ser
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), max(1, self._ser.in_waiting))
+        data = self._ser.read(n)
+        b[:len(data)] = data
+        return len(data)
+
+
+def _buffered_reader(ser):
+    """Lector con buffer grande: menos llamadas al sistema por línea"""
+    return io.BufferedReader(_SerialRaw(ser), SERIAL_READ_BUFFER)
+
+
+def _normalize_angle(angle):
+    """Lleva un ángulo en grados al rango [0, 360)"""
+    return angle % 360
+
+
+def _reward(obs, w_flow, w_setpoint, w_horizontal, w_vertical):
+    """Recompensa escalar: penaliza error de caudal, setpoint y desvío de 90° en ambos ángulos"""
+    flow_rate = float(obs[2])
+    setpoint = float(obs[5])
+    return -(w_flow * abs(flow_rate - setpoint) +
+             w_setpoint * abs(setpoint) +
+             w_horizontal * abs(float(obs[3]) - 90.0) +
+             w_vertical * abs(float(obs[4]) - 90.0))
+
 
 class RobotEnv(gym.Env):
     metadata = {'render.modes': ['human']}
 
-    def __init__(self, port='COM4', baudrate=115200, controlador_port='COM13'):
+    # Claves de telemetría que parse_data copia desde el JSON recibido
+    # (inputA se trata aparte: se normaliza a [0, 360) solo si llega en la trama)
+    _SENSOR_KEYS = ('inputX', 'inputV', 'limite_angulo', 'limite_corredera', 'limite_valvula')
+    _ACT_KEYS = ('setpoint_corredera', 'setpoint_angle', 'setpoint_water',
+                 'pid_corredera', 'pid_angle', 'pid_valvula', 'manual_mode',
+                 'energia_motor_corredera', 'energia_motor_angulo', 'energia_motor_valvula',
+                 'calibrating')
+
+    # Disposición del vector de observación: (origen, clave, posición).
+    # origen 0 = sensores, 1 = actuadores; los PID ocupan tres posiciones.
+    _OBS_SCALARS = ((0, 'inputX', 0), (0, 'inputA', 1), (0, 'inputV', 2),
+                    (1, 'setpoint_corredera', 3), (1, 'setpoint_angle', 4), (1, 'setpoint_water', 5),
+                    (1, 'manual_mode', 15), (1, 'energia_motor_corredera', 16),
+                    (1, 'energia_motor_angulo', 17), (1, 'energia_motor_valvula', 18),
+                    (1, 'calibrating', 19),
+                    (0, 'limite_angulo', 20), (0, 'limite_corredera', 21), (0, 'limite_valvula', 22))
+    _OBS_VECTORS = ((1, 'pid_corredera', 6), (1, 'pid_angle', 9), (1, 'pid_valvula', 12))
+
+    def __init__(self, port='COM4', baudrate=115200, controlador_port='COM13', wire_format='json',
+                 step_timeout=0.5, post_open_delay=2.0):
         super(RobotEnv, self).__init__()
 
+        if wire_format not in ('json', 'binary'):
+            raise ValueError(f"wire_format no soportado: {wire_format}")
+        self.wire_format = wire_format
+
         self.action_space = gym.spaces.Box(
             low=np.array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, -255, -255, -255, 0, 0]),
             high=np.array([400, 180, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 1, 255, 255, 255, 1, 1]),
@@ -31,9 +156,26 @@ class RobotEnv(gym.Env):
         self.port = port
         self.baudrate = baudrate
         self.ser = None
+        self._rbuf = None
+        self._partial = b''
+        # Apertura/cierre del puerto serializados: evita reconexiones simultáneas
+        self._port_lock = threading.Lock()
+        self.post_open_delay = post_open_delay
         self.data_queue = queue.Queue()
+        self._log_q = deque(maxlen=LOG_QUEUE_SIZE)
+        self._obs_buf = np.empty(23, dtype=np.float32)
+        # Última observación recibida: step la reutiliza si no llega telemetría a tiempo
+        self.step_timeout = step_timeout
+        self._last_obs = np.zeros(23, dtype=np.float32)
         self.current_action = np.zeros(19)
-        self.memory = deque(maxlen=1000)
+        # Historial de pasos en arrays paralelos (buffer circular), desactivado por defecto
+        self.record_memory = False
+        self._mem_time = np.zeros(MEMORY_SIZE, dtype=np.float64)
+        self._mem_obs = np.zeros((MEMORY_SIZE, 23), dtype=np.float32)
+        self._mem_action = np.zeros((MEMORY_SIZE, self.current_action.size), dtype=np.float32)
+        self._mem_reward = np.zeros(MEMORY_SIZE, dtype=np.float32)
+        self._mem_done = np.zeros(MEMORY_SIZE, dtype=bool)
+        self._mem_idx = 0
         self.start_time = time.time()
 
         self.weights = {
@@ -42,6 +184,7 @@ class RobotEnv(gym.Env):
             'angle_horizontal_weight': 0.1,
             'angle_vertical_weight': 0.1
         }
+        self._update_reward_weights()
 
         self.control_mode = False
         self.reward_threshold = -10
@@ -69,7 +212,23 @@ class RobotEnv(gym.Env):
             'calibrating': 0
         }
 
-        self.controlador = self.Controlador(controlador_port, baudrate)
+        # Plantilla del comando periódico: se sobrescriben los valores en sitio
+        self._cmd_actuadores = {
+            'setpoint_corredera': 0.0,
+            'setpoint_angle': 0.0,
+            'setpoint_water': 0.0,
+            'pid_corredera': [0.0, 0.0, 0.0],
+            'pid_angle': [0.0, 0.0, 0.0],
+            'pid_valvula': [0.0, 0.0, 0.0],
+            'manual_mode': 0,
+            'energia_motor_corredera': 0.0,
+            'energia_motor_angulo': 0.0,
+            'energia_motor_valvula': 0.0,
+            'calibrating': 0
+        }
+        self._cmd_tmpl = {'actuadores': self._cmd_actuadores}
+
+        self.controlador = self.Controlador(controlador_port, baudrate, post_open_delay)
 
         self.controlador_data = {
             'some_controller_variable1': 0,
@@ -78,258 +237,207 @@ class RobotEnv(gym.Env):
 
         self.connect_serial()
 
-        self.read_thread = threading.Thread(target=self.read_serial)
-        self.read_thread.daemon = True
-        self.read_thread.start()
+        self.log_thread = threading.Thread(target=self._flush_log)
+        self.log_thread.daemon = True
+        self.log_thread.start()
 
-        self.send_thread = threading.Thread(target=self.send_data_periodically)
-        self.send_thread.daemon = True
-        self.send_thread.start()
+        self.io_thread = threading.Thread(target=self.io_loop)
+        self.io_thread.daemon = True
+        self.io_thread.start()
 
         self.control_thread = threading.Thread(target=self.control_loop)
         self.control_thread.daemon = True
         self.control_thread.start()
 
-    def connect_serial(self):
-        if self.ser is not None and self.ser.is_open:
-            self.ser.close()
-        try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2)
-            print(f"Connected to serial port {self.port}")
-            return True
-        except serial.SerialException as e:
-            print(f"Error connecting to serial port {self.port}: {e}")
-            self.ser = None
-            return False
+    def connect_serial(self, force=True):
+        """Abre el puerto; con force=False no hace nada si otro hilo ya lo reabrió"""
+        with self._port_lock:
+            if self.ser is not None and self.ser.is_open:
+                if not force:
+                    return True
+                self.ser.close()
+            try:
+                self.ser = serial.Serial(self.port, self.baudrate, timeout=SERIAL_READ_TIMEOUT)
+                self._rbuf = _buffered_reader(self.ser)
+                self._partial = b''
+                time.sleep(self.post_open_delay)
+                print(f"Connected to serial port {self.port}")
+                return True
+            except serial.SerialException as e:
+                print(f"Error connecting to serial port {self.port}: {e}")
+                self.ser = None
+                return False
 
     def disconnect_serial(self):
-        if self.ser is not None and self.ser.is_open:
-            self.ser.close()
-            self.ser = None
-            print(f"Disconnected from serial port {self.port}")
+        with self._port_lock:
+            if self.ser is not None and self.ser.is_open:
+                self.ser.close()
+                self.ser = None
+                self._rbuf = None
+                print(f"Disconnected from serial port {self.port}")
 
-    def read_serial(self):
+    def io_loop(self):
+        """Hilo único de E/S serie: lee telemetría y envía el comando cada SEND_INTERVAL"""
         time.sleep(2)
+        next_send = time.monotonic()
         while True:
             if self.ser is None or not self.ser.is_open:
                 time.sleep(1)
                 continue
-            try:
-                line = self.ser.readline().decode('utf-8').strip()
-                if not line:
-                    continue
-                print(f"Received: {line}")
-                parsed_data = self.parse_data(line)
-                if parsed_data is not None:
-                    self.data_queue.put(parsed_data)
-            except serial.SerialException as e:
-                print(f"Error reading serial data: {e}")
-                self.ser = None
-            except Exception as e:
-                print(f"Unexpected error: {e}")
+            now = time.monotonic()
+            if now >= next_send:
+                self.send_periodic_command()
+                next_send = now + SEND_INTERVAL
+            self.read_serial()
+
+    def read_serial(self):
+        """Lee (como mucho) una línea de telemetría; espera a lo sumo SERIAL_READ_TIMEOUT"""
+        try:
+            # Bytes crudos: el parser JSON no necesita decodificar antes
+            chunk = self._rbuf.readline()
+            if not chunk:
+                return
+            if not chunk.endswith(b'\n'):
+                # Línea cortada por el timeout: se completa en la siguiente lectura
+                self._partial += chunk
+                return
+            if self._partial:
+                chunk = self._partial + chunk
+                self._partial = b''
+            line = chunk.strip()
+            if not line:
+                return
+            self._log_q.append(("Received", line))
+            parsed_data = self.parse_data(line)
+            if parsed_data is not None:
+                self._last_obs = parsed_data
+                self.data_queue.put(parsed_data)
+        except serial.SerialException as e:
+            print(f"Error reading serial data: {e}")
+            self.ser = None
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+
+    def _flush_log(self):
+        """Vuelca las trazas encoladas a stdout en bloque (decodifica fuera del hilo de lectura)"""
+        log_q = self._log_q
+        while True:
+            time.sleep(LOG_FLUSH_INTERVAL)
+            lines = []
+            while log_q:
+                try:
+                    prefix, payload = log_q.popleft()
+                except IndexError:
+                    break
+                if isinstance(payload, bytes):
+                    payload = payload.decode('utf-8', 'replace')
+                lines.append(f"{prefix}: {payload}")
+            if lines:
+                sys.stdout.write('\n'.join(lines) + '\n')
+                sys.stdout.flush()
 
     def parse_data(self, line):
         try:
-            data = json.loads(line)
+            data = _json_loads(line)
             sensores = data.get('sensores', {})
             actuadores = data.get('actuadores', {})
 
-            try:
-                self.sensores['inputX'] = sensores.get('inputX', self.sensores['inputX'])
-            except KeyError:
-                print("inputX key missing in sensores")
-
-            try:
-                self.sensores['inputA'] = sensores.get('inputA', self.sensores['inputA']) % 360
-            except KeyError:
-                print("inputA key missing in sensores")
-
-            try:
-                self.sensores['inputV'] = sensores.get('inputV', self.sensores['inputV'])
-            except KeyError:
-                print("inputV key missing in sensores")
-
-            try:
-                self.sensores['limite_angulo'] = sensores.get('limite_angulo', self.sensores['limite_angulo'])
-            except KeyError:
-                print("limite_angulo key missing in sensores")
-
-            try:
-                self.sensores['limite_corredera'] = sensores.get('limite_corredera', self.sensores['limite_corredera'])
-            except KeyError:
-                print("limite_corredera key missing in sensores")
-
-            try:
-                self.sensores['limite_valvula'] = sensores.get('limite_valvula', self.sensores['limite_valvula'])
-            except KeyError:
-                print("limite_valvula key missing in sensores")
-
-            try:
-                self.actuadores['setpoint_corredera'] = actuadores.get('setpoint_corredera',
-                                                                       self.actuadores['setpoint_corredera'])
-            except KeyError:
-                print("setpoint_corredera key missing in actuadores")
-
-            try:
-                self.actuadores['setpoint_angle'] = actuadores.get('setpoint_angle', self.actuadores['setpoint_angle'])
-            except KeyError:
-                print("setpoint_angle key missing in actuadores")
-
-            try:
-                self.actuadores['setpoint_water'] = actuadores.get('setpoint_water', self.actuadores['setpoint_water'])
-            except KeyError:
-                print("setpoint_water key missing in actuadores")
-
-            try:
-                self.actuadores['pid_corredera'] = actuadores.get('pid_corredera', self.actuadores['pid_corredera'])
-            except KeyError:
-                print("pid_corredera key missing in actuadores")
-
-            try:
-                self.actuadores['pid_angle'] = actuadores.get('pid_angle', self.actuadores['pid_angle'])
-            except KeyError:
-                print("pid_angle key missing in actuadores")
-
-            try:
-                self.actuadores['pid_valvula'] = actuadores.get('pid_valvula', self.actuadores['pid_valvula'])
-            except KeyError:
-                print("pid_valvula key missing in actuadores")
-
-            try:
-                self.actuadores['manual_mode'] = actuadores.get('manual_mode', self.actuadores['manual_mode'])
-            except KeyError:
-                print("manual_mode key missing in actuadores")
-
-            try:
-                self.actuadores['energia_motor_corredera'] = actuadores.get('energia_motor_corredera',
-                                                                            self.actuadores['energia_motor_corredera'])
-            except KeyError:
-                print("energia_motor_corredera key missing in actuadores")
-
-            try:
-                self.actuadores['energia_motor_angulo'] = actuadores.get('energia_motor_angulo',
-                                                                         self.actuadores['energia_motor_angulo'])
-            except KeyError:
-                print("energia_motor_angulo key missing in actuadores")
-
-            try:
-                self.actuadores['energia_motor_valvula'] = actuadores.get('energia_motor_valvula',
-                                                                          self.actuadores['energia_motor_valvula'])
-            except KeyError:
-                print("energia_motor_valvula key missing in actuadores")
-
-            try:
-                self.actuadores['calibrating'] = actuadores.get('calibrating', self.actuadores['calibrating'])
-            except KeyError:
-                print("calibrating key missing in actuadores")
-
-            return np.array([
-                self.sensores['inputX'],
-                self.sensores['inputA'],
-                self.sensores['inputV'],
-                self.actuadores['setpoint_corredera'],
-                self.actuadores['setpoint_angle'],
-                self.actuadores['setpoint_water'],
-                self.actuadores['pid_corredera'][0],
-                self.actuadores['pid_corredera'][1],
-                self.actuadores['pid_corredera'][2],
-                self.actuadores['pid_angle'][0],
-                self.actuadores['pid_angle'][1],
-                self.actuadores['pid_angle'][2],
-                self.actuadores['pid_valvula'][0],
-                self.actuadores['pid_valvula'][1],
-                self.actuadores['pid_valvula'][2],
-                self.actuadores['manual_mode'],
-                self.actuadores['energia_motor_corredera'],
-                self.actuadores['energia_motor_angulo'],
-                self.actuadores['energia_motor_valvula'],
-                self.actuadores['calibrating'],
-                self.sensores['limite_angulo'],
-                self.sensores['limite_corredera'],
-                self.sensores['limite_valvula']
-            ])
+            self.sensores.update({k: sensores[k] for k in self._SENSOR_KEYS if k in sensores})
+            if 'inputA' in sensores:
+                self.sensores['inputA'] = _normalize_angle(sensores['inputA'])
+            self.actuadores.update({k: actuadores[k] for k in self._ACT_KEYS if k in actuadores})
+
+            # Rellenar el buffer preasignado; la copia es la que viaja por la cola
+            src = (self.sensores, self.actuadores)
+            buf = self._obs_buf
+            for origin, key, pos in self._OBS_SCALARS:
+                buf[pos] = src[origin][key]
+            for origin, key, pos in self._OBS_VECTORS:
+                buf[pos:pos + 3] = src[origin][key][:3]
+            return buf.copy()
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON: {line} - {e}")
             return None
 
     def step(self, action):
         self.current_action = action
-        obs = self.get_observation()
-        while obs is None:
-            try:
-                obs = self.data_queue.get(timeout=1)
-            except queue.Empty:
-                continue
+        try:
+            obs = self.data_queue.get(timeout=self.step_timeout)
+        except queue.Empty:
+            obs = self._last_obs
 
         reward = self.calculate_reward(obs)
         done = self.is_done(reward)
 
-        elapsed_time = time.time() - self.start_time
-        self.memory.append((elapsed_time, obs, action, reward, done))
+        if self.record_memory:
+            self._record_step(time.time() - self.start_time, obs, action, reward, done)
 
         return obs, reward, done, {}
 
     def send_command(self, command):
         if self.ser is None or not self.ser.is_open:
-            self.connect_serial()
+            self.connect_serial(force=False)
         try:
-            command_str = json.dumps(command) + '\n'
-            print(f"Sent: {command_str}")
+            body = _json_dumps(command)
+            self._log_q.append(("Sent", body))
             if self.ser:
-                self.ser.write(command_str.encode())
+                self.ser.write(body + b'\n')
 
-            self.controlador.send_response(f"Sent: {command_str}")
+            self.controlador.send_response(f"Sent: {body.decode()}")
 
         except serial.SerialException as e:
             print(f"Error writing to serial port: {e}")
             self.ser = None
 
-    def send_data_periodically(self):
-        while True:
-            if self.ser is not None and self.ser.is_open:
-                command = {
-                    'actuadores': {
-                        'setpoint_corredera': float(self.current_action[0]),
-                        'setpoint_angle': float(self.current_action[1]),
-                        'setpoint_water': float(self.current_action[2]),
-                        'pid_corredera': [float(self.current_action[3]), float(self.current_action[4]),
-                                          float(self.current_action[5])],
-                        'pid_angle': [float(self.current_action[6]), float(self.current_action[7]),
-                                      float(self.current_action[8])],
-                        'pid_valvula': [float(self.current_action[9]), float(self.current_action[10]),
-                                        float(self.current_action[11])],
-                        'manual_mode': int(self.current_action[12]),
-                        'energia_motor_corredera': float(self.current_action[13]),
-                        'energia_motor_angulo': float(self.current_action[14]),
-                        'energia_motor_valvula': float(self.current_action[15]),
-                        'calibrating': int(self.current_action[16])
-                    }
-                }
-                self.send_command(command)
-                print("enviando_", command)
-            time.sleep(0.3)
-
-    def calculate_reward(self, obs):
+    def send_binary_command(self, action):
+        """Envía la acción como trama binaria fija (_CMD_STRUCT)"""
+        a = action.tolist()
+        frame = _CMD_STRUCT.pack(_CMD_SYNC, *a[:12], int(a[12]) & 0xFF, *a[13:16], int(a[16]) & 0xFF)
+        try:
+            if self.ser:
+                self.ser.write(frame)
+                self._log_q.append(("Sent", frame.hex()))
+        except serial.SerialException as e:
+            print(f"Error writing to serial port: {e}")
+            self.ser = None
 
-        flow_rate = obs[2]
-        setpoint = obs[5]
-        angle_horizontal = obs[3]
-        angle_vertical = obs[4]
+    def send_periodic_command(self):
+        """Envía la acción actual con el formato de cable configurado"""
+        if self.wire_format == 'binary':
+            self.send_binary_command(self.current_action)
+            return
+        # Una sola conversión a floats de Python para toda la acción
+        a = self.current_action.astype(float).tolist()
+        act = self._cmd_actuadores
+        act['setpoint_corredera'] = a[0]
+        act['setpoint_angle'] = a[1]
+        act['setpoint_water'] = a[2]
+        act['pid_corredera'][:] = a[3:6]
+        act['pid_angle'][:] = a[6:9]
+        act['pid_valvula'][:] = a[9:12]
+        act['manual_mode'] = int(a[12])
+        act['energia_motor_corredera'] = a[13]
+        act['energia_motor_angulo'] = a[14]
+        act['energia_motor_valvula'] = a[15]
+        act['calibrating'] = int(a[16])
+        self.send_command(self._cmd_tmpl)
 
-        reward = -(self.weights['flow_rate_weight'] * abs(flow_rate - setpoint) +
-                   self.weights['setpoint_weight'] * abs(setpoint) +
-                   self.weights['angle_horizontal_weight'] * abs(angle_horizontal - 90) +
-                   self.weights['angle_vertical_weight'] * abs(angle_vertical - 90))
+    def calculate_reward(self, obs):
+        return _reward(obs, *self._w)
 
-        return reward
+    def _update_reward_weights(self):
+        # Pesos como tupla de floats: evita cuatro búsquedas en el dict por paso
+        self._w = (float(self.weights['flow_rate_weight']),
+                   float(self.weights['setpoint_weight']),
+                   float(self.weights['angle_horizontal_weight']),
+                   float(self.weights['angle_vertical_weight']))
 
     def is_done(self, reward):
         return reward <= self.reward_threshold
 
     def reset(self):
         if self.ser is None:
-            self.connect_serial()
+            self.connect_serial(force=False)
         if self.ser:
             self.ser.write(b'reset\n')
         time.sleep(2)
@@ -346,8 +454,28 @@ class RobotEnv(gym.Env):
         except queue.Empty:
             return None
 
+    def enable_memory_recording(self, enabled=True):
+        """Activa (o desactiva) el registro de pasos en el historial"""
+        self.record_memory = bool(enabled)
+
+    def _record_step(self, elapsed_time, obs, action, reward, done):
+        i = self._mem_idx % MEMORY_SIZE
+        self._mem_time[i] = elapsed_time
+        self._mem_obs[i] = obs
+        row = self._mem_action[i]
+        act = np.asarray(action, dtype=np.float32).ravel()[:row.size]
+        row[:act.size] = act
+        row[act.size:] = 0
+        self._mem_reward[i] = reward
+        self._mem_done[i] = done
+        self._mem_idx += 1
+
     def get_last_steps(self, num_steps):
-        return list(self.memory)[-num_steps:]
+        """Devuelve (tiempos, obs, acciones, rewards, dones) de los últimos pasos, del más antiguo al más reciente"""
+        n = max(0, min(num_steps, self._mem_idx, MEMORY_SIZE))
+        idx = np.arange(self._mem_idx - n, self._mem_idx) % MEMORY_SIZE
+        return (self._mem_time[idx], self._mem_obs[idx], self._mem_action[idx],
+                self._mem_reward[idx], self._mem_done[idx])
 
     def set_servos(self, angle_horizontal, angle_vertical, angle_valve):
         self.current_action[0] = angle_horizontal
@@ -393,6 +521,7 @@ class RobotEnv(gym.Env):
         self.weights['setpoint_weight'] = setpoint_weight
         self.weights['angle_horizontal_weight'] = angle_horizontal_weight
         self.weights['angle_vertical_weight'] = angle_vertical_weight
+        self._update_reward_weights()
 
     def control_loop(self):
         while True:
@@ -406,30 +535,39 @@ class RobotEnv(gym.Env):
                     self.controlador.send_response("Invalid command format.")
 
     class Controlador:
-        def __init__(self, port='COM13', baudrate=115200):
+        def __init__(self, port='COM13', baudrate=115200, post_open_delay=2.0):
             self.port = port
             self.baudrate = baudrate
             self.ser = None
+            self._rbuf = None
+            self._port_lock = threading.Lock()
+            self.post_open_delay = post_open_delay
             self.connect_serial()
 
-        def connect_serial(self):
-            if self.ser is not None and self.ser.is_open:
-                self.ser.close()
-            try:
-                self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-                time.sleep(2)
-                print(f"Connected to serial port {self.port}")
-                return True
-            except serial.SerialException as e:
-                print(f"Error connecting to serial port {self.port}: {e}")
-                self.ser = None
-                return False
+        def connect_serial(self, force=True):
+            with self._port_lock:
+                if self.ser is not None and self.ser.is_open:
+                    if not force:
+                        return True
+                    self.ser.close()
+                try:
+                    self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+                    self._rbuf = _buffered_reader(self.ser)
+                    time.sleep(self.post_open_delay)
+                    print(f"Connected to serial port {self.port}")
+                    return True
+                except serial.SerialException as e:
+                    print(f"Error connecting to serial port {self.port}: {e}")
+                    self.ser = None
+                    return False
 
         def disconnect_serial(self):
-            if self.ser is not None and self.ser.is_open:
-                self.ser.close()
-                self.ser = None
-                print(f"Disconnected from serial port {self.port}")
+            with self._port_lock:
+                if self.ser is not None and self.ser.is_open:
+                    self.ser.close()
+                    self.ser = None
+                    self._rbuf = None
+                    print(f"Disconnected from serial port {self.port}")
 
         def receive_command(self):
             while True:
@@ -437,7 +575,7 @@ class RobotEnv(gym.Env):
                     time.sleep(1)
                     continue
                 try:
-                    line = self.ser.readline().decode('utf-8').strip()
+                    line = self._rbuf.readline().decode('utf-8').strip()
                     if not line:
                         continue
                     print(f"Received command: {line}")
@@ -450,7 +588,7 @@ class RobotEnv(gym.Env):
 
         def send_response(self, response):
             if self.ser is None or not self.ser.is_open:
-                self.connect_serial()
+                self.connect_serial(force=False)
             try:
                 response_str = response + '\n'
                 print(f"Sent: {response_str}")
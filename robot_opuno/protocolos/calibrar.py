@@ -9,9 +9,15 @@ El runner controla duración.
 """
 
 import math
+import numpy as np
 from typing import Dict, Any
 from protocolos import ProtocoloBase
 
+# Observación normalizada cuando el entorno no entrega un dict (solo lectura)
+_NO_DATA = {}
+
+_MEAS_INITIAL_SIZE = 1024
+
 class Calibrar(ProtocoloBase):
     """
     Protocolo de calibración: mueve motor a velocidad constante.
@@ -61,18 +67,34 @@ class Calibrar(ProtocoloBase):
         self.axis = str(kwargs.get('axis', 'x')).lower()
         self.direction = str(kwargs.get('direction', 'forward'))
         self.speed = int(kwargs.get('speed', 50))
-        self.measurements = []
+        # Sin verbose, step no formatea el texto de log
+        self._verbose = bool(kwargs.get('verbose', True))
+        self._obs_key = 'x_mm' if self.axis == 'x' else 'a_deg'
+        # Mediciones en buffer float32 con crecimiento amortizado
+        self._meas = np.empty(_MEAS_INITIAL_SIZE, np.float32)
+        self._n = 0
         self.min_value = None
         self.max_value = None
+        # Mínimo/máximo acumulados (O(1) por paso)
+        self._mn = math.inf
+        self._mx = -math.inf
     
     def reset(self):
         """Estado inicial"""
         super().reset()
-        self.measurements = []
+        self._meas = np.empty(_MEAS_INITIAL_SIZE, np.float32)
+        self._n = 0
         self.min_value = None
         self.max_value = None
+        self._mn = math.inf
+        self._mx = -math.inf
         return self._get_initial_observation()
     
+    @property
+    def measurements(self):
+        """Vista de las mediciones registradas"""
+        return self._meas[:self._n]
+    
     def setup(self, env):
         """Configuración inicial"""
         self.env = env
@@ -83,9 +105,10 @@ class Calibrar(ProtocoloBase):
             env.set_energia_corredera(0)
             env.set_energia_angulo(0)
             
-            if self.measurements:
-                self.min_value = min(self.measurements)
-                self.max_value = max(self.measurements)
+            if self._n:
+                meas = self._meas[:self._n]
+                self.min_value = float(meas.min())
+                self.max_value = float(meas.max())
                 range_size = self.max_value - self.min_value
                 print(f"[Calibrar] Rango {self.axis}: [{self.min_value:.1f}, {self.max_value:.1f}] = {range_size:.1f}")
         except:
@@ -98,32 +121,39 @@ class Calibrar(ProtocoloBase):
         El runner decide cuándo parar (por tiempo).
         """
         super().step(action)
+        axis, speed = self.axis, self.speed
         
         # 1. Obtener observación
         obs = self._get_observation()
-        if isinstance(obs, dict):
-            current_value = float(obs.get('x_mm' if self.axis == 'x' else 'a_deg', 0.0))
-        else:
-            current_value = 0.0
+        data = obs if isinstance(obs, dict) else _NO_DATA
+        current_value = float(data.get(self._obs_key, 0.0))
         
         # Registrar medición
-        self.measurements.append(current_value)
+        meas, n = self._meas, self._n
+        if n == meas.size:
+            meas = self._meas = np.resize(meas, meas.size * 2)
+        meas[n] = current_value
+        n = self._n = n + 1
+        if current_value < self._mn:
+            self._mn = current_value
+        if current_value > self._mx:
+            self._mx = current_value
         
         # 2. Calcular acción (velocidad constante)
-        velocity = self.speed if self.direction == 'forward' else -self.speed
+        velocity = speed if self.direction == 'forward' else -speed
         
         patch = {
             "codigoModo": 1  # Manual mode
         }
         
-        if self.axis == 'x':
+        if axis == 'x':
             patch["energiaX"] = velocity
         else:
             patch["energiaA"] = velocity
         
         # 3. Calcular reward (rango explorado)
-        if len(self.measurements) > 1:
-            current_range = max(self.measurements) - min(self.measurements)
+        if n > 1:
+            current_range = self._mx - self._mn
             reward = min(current_range, 300.0)  # Cap at 300
         else:
             reward = 0.0
@@ -132,14 +162,14 @@ class Calibrar(ProtocoloBase):
         done = False
         
         # 5. Info y log
-        log = f"📊 Calibrando {self.axis}: {current_value:.1f} (muestras: {len(self.measurements)})"
+        log = f"📊 Calibrando {axis}: {current_value:.1f} (muestras: {n})" if self._verbose else ''
         
         info = {
             "patch": patch,
             "sleep_ms": 100,
             "log": log,
             "current_value": current_value,
-            "samples": len(self.measurements)
+            "samples": n
         }
         
         return obs, reward, done, info
@@ -23,20 +23,22 @@ Versión: 2.1 Compatible
 import os
 import re
 import sys
+import atexit
+import copy
 import json
 import time
+import queue
 import threading
 import webbrowser
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, fields, replace
 from contextlib import nullcontext
 
-from flask import Flask, request, jsonify, make_response, render_template, Response, stream_with_context, send_from_directory
-from werkzeug.exceptions import NotFound
+from flask import Flask, request, jsonify, make_response, render_template, Response, stream_with_context, send_from_directory, abort
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from flask_sock import Sock
 try:
     from werkzeug.serving import WSGIRequestHandler as _WerkReq
@@ -52,6 +54,11 @@ except ImportError:
     SERIAL_AVAILABLE = False
     list_ports = None
 
+try:
+    import orjson  # Serialización JSON en C para el camino de estado
+except ImportError:
+    orjson = None
+
 # Cámara no utilizada en versión mínima
 
 # Importar el entorno del robot (EXISTENTE)
@@ -105,16 +112,94 @@ for directory in [DATA_DIR, PROTOCOLS_DIR, TEMPLATES_DIR, STATIC_DIR, LOGS_DIR]:
 # Archivos de datos
 SETTINGS_FILE = DATA_DIR / "settings_ui.json"
 
-# Inicializar archivos si no existen
-if not SETTINGS_FILE.exists():
-    SETTINGS_FILE.write_text('{"version":1}', encoding="utf-8")
+# Inicializar archivos si no existen ("x": crea solo si no existe, sin stat previo)
+try:
+    with open(SETTINGS_FILE, "x", encoding="utf-8") as fh:
+        fh.write('{"version":1}')
+except FileExistsError:
+    pass
+
+
+# Settings parseados en memoria; se releen solo si cambia el mtime del archivo
+_settings_cache: Dict[str, Any] = {"mtime_ns": -1, "data": {}}
+_settings_lock = threading.Lock()
+
+
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _dumps(obj: Any) -> str:
+    """json.dumps(ensure_ascii=False) con orjson si está disponible (texto para WS/SSE)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _dumps_bytes(obj: Any) -> bytes:
+    """Como _dumps pero en UTF-8: orjson ya produce bytes, sin decode/encode de ida y vuelta."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(raw: Any) -> Any:
+    """json.loads con orjson si está disponible (acepta str o bytes)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _jsonify(obj: Any, status: int = 200):
+    """Equivalente a jsonify() serializando con orjson si está disponible."""
+    body = None
+    if orjson is not None:
+        try:
+            body = orjson.dumps(obj, option=_ORJSON_OPTS)
+        except TypeError:
+            body = None
+    if body is None:
+        resp = jsonify(obj)
+        resp.status_code = status
+        return resp
+    resp = make_response(body, status)
+    resp.mimetype = "application/json"
+    return resp
+
+
+def _read_settings_file() -> dict:
+    """Lee y parsea el archivo de settings con os.read directo (archivo chico)."""
+    fd = os.open(SETTINGS_FILE, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    raw = b"".join(chunks)
+    if not raw.strip():
+        return {}
+    return _loads(raw)
 
 
 def _load_settings_dict() -> dict:
     """Lee el archivo de settings de forma segura incluso si aún no hay datos."""
     try:
-        txt = SETTINGS_FILE.read_text(encoding="utf-8")
-        return json.loads(txt or "{}")
+        with _settings_lock:
+            mtime_ns = SETTINGS_FILE.stat().st_mtime_ns
+            if mtime_ns != _settings_cache["mtime_ns"]:
+                _settings_cache["data"] = _read_settings_file()
+                _settings_cache["mtime_ns"] = mtime_ns
+            # Copia: los llamadores modifican el dict antes de guardarlo
+            return copy.deepcopy(_settings_cache["data"])
     except Exception:
         return {}
 
@@ -122,7 +207,16 @@ def _load_settings_dict() -> dict:
 def _save_settings_dict(d: dict) -> bool:
     """Persiste el diccionario de settings en disco."""
     try:
-        SETTINGS_FILE.write_text(json.dumps(d, indent=2, ensure_ascii=False), encoding="utf-8")
+        with _settings_lock:
+            # Escritura atómica: temporal + replace, el archivo nunca queda a medias
+            tmp = SETTINGS_FILE.with_suffix(".json.tmp")
+            if orjson is not None:
+                tmp.write_bytes(orjson.dumps(d, option=orjson.OPT_INDENT_2 | _ORJSON_OPTS))
+            else:
+                tmp.write_text(json.dumps(d, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, SETTINGS_FILE)
+            _settings_cache["data"] = copy.deepcopy(d)
+            _settings_cache["mtime_ns"] = SETTINGS_FILE.stat().st_mtime_ns
         return True
     except Exception as exc:
         if "logger" in globals() and logger is not None:
@@ -140,7 +234,8 @@ DEFAULT_BAUDRATE = 115200
 # CLASES DE DATOS
 # =============================================================================
 
-@dataclass
+# slots: sin __dict__ por instancia; se crea una por cada lectura de estado
+@dataclass(slots=True)
 class RobotStatus:
     """Estado actual del robot"""
     x_mm: float = 0.0
@@ -159,8 +254,10 @@ class RobotStatus:
     serial_open: bool = False
     serial_port: str = DEFAULT_SERIAL_PORT
     baudrate: int = DEFAULT_BAUDRATE
-    # Energías actuales (basadas en el último comando TX)
-    energies: Dict[str, int] = field(default_factory=lambda: {"x": 0, "a": 0, "bomba": 0})
+    # Energías actuales (basadas en el último comando TX); dict en `energies`
+    energy_x: int = 0
+    energy_a: int = 0
+    energy_bomba: int = 0
     # Marca si los datos son de caché (sin RX reciente)
     stale: bool = False
     # Nuevos campos expuestos
@@ -187,6 +284,23 @@ class RobotStatus:
     objective_pending: bool = False
     objective_margin_ml: float = 0.05
     flow_target_est_mls: float = 0.0
+    
+    @property
+    def energies(self) -> Dict[str, int]:
+        """Vista {"x", "a", "bomba"} de las energías; se arma solo al pedirla."""
+        return {"x": self.energy_x, "a": self.energy_a, "bomba": self.energy_bomba}
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Copia plana por campo, sin la recursión genérica de dataclasses.asdict
+        return {name: getattr(self, name) for name in _STATUS_FIELDS}
+
+
+# Claves del payload: las energías escalares salen agrupadas como "energies"
+_STATUS_FIELDS = tuple(
+    "energies" if f.name == "energy_x" else f.name
+    for f in fields(RobotStatus)
+    if f.name not in ("energy_a", "energy_bomba")
+)
 
 
 
@@ -199,46 +313,98 @@ class RobotLogger:
     
     def __init__(self, capacity: int = 1000):
         self._capacity = capacity
-        self._buffer: List[str] = []
+        # Buffer circular: append O(1) y descarte automático de lo más antiguo
+        self._buffer: deque = deque(maxlen=capacity)
         self._lock = threading.Lock()
-        # Logger de archivo con rotación
+        # Timestamp formateado del segundo actual: (texto, segundo)
+        self._ts_cache = ("", 0)
+        # Con DEBUG desactivado, log(..., "DEBUG") retorna antes de formatear
+        self.debug_enabled = os.environ.get("OPUNO_LOG_DEBUG", "1") != "0"
+        # Logger de archivo con rotación: escritura y rotación en el hilo del QueueListener
+        self._listener: Optional[QueueListener] = None
         try:
             self._py_logger = logging.getLogger('opuno_server')
             self._py_logger.setLevel(logging.INFO)
-            log_path = str((LOGS_DIR / 'opuno_server.log').resolve())
-            handler = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=5, encoding='utf-8')
-            handler.setLevel(logging.INFO)
-            fmt = logging.Formatter('%(message)s')
-            handler.setFormatter(fmt)
             # Evitar duplicados si se reimporta
-            if not any(isinstance(h, RotatingFileHandler) for h in self._py_logger.handlers):
-                self._py_logger.addHandler(handler)
+            if not any(isinstance(h, QueueHandler) for h in self._py_logger.handlers):
+                log_path = str((LOGS_DIR / 'opuno_server.log').resolve())
+                handler = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=5, encoding='utf-8')
+                handler.setLevel(logging.INFO)
+                fmt = logging.Formatter('%(message)s')
+                handler.setFormatter(fmt)
+                log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+                self._py_logger.addHandler(QueueHandler(log_queue))
+                self._listener = QueueListener(log_queue, handler, respect_handler_level=True)
+                self._listener.start()
+                atexit.register(self._listener.stop)
         except Exception:
             self._py_logger = None  # type: ignore
+        # Buzón hacia el hilo de salida: log() no espera a consola ni archivo
+        self._mbox: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._drainer = threading.Thread(target=self._drain, name="robot-logger", daemon=True)
+        self._drainer.start()
+        # Registrado después del listener: atexit es LIFO, así el buzón se vacía
+        # (incluidos logs de otros hooks atexit) antes de listener.stop
+        atexit.register(self._shutdown)
     
-    def log(self, message: str, level: str = "INFO"):
-        """Registra un mensaje con timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+    def log(self, message: str, level: str = "INFO", *args: Any):
+        """Registra un mensaje con timestamp; con args se formatea como message % args"""
+        if level == "DEBUG" and not self.debug_enabled:
+            return
+        if args:
+            message = message % args
+        now = time.time()
+        sec = int(now)
+        timestamp, cached_sec = self._ts_cache
+        if sec != cached_sec:
+            timestamp = time.strftime("%H:%M:%S", time.localtime(now))
+            self._ts_cache = (timestamp, sec)
         log_entry = f"[{timestamp}] [{level}] {message}"
         
         with self._lock:
             self._buffer.append(log_entry)
-            if len(self._buffer) > self._capacity:
-                self._buffer = self._buffer[-self._capacity:]
-        
-        # Consola
-        print(log_entry, flush=True)
-        # Archivo (rotativo)
-        try:
-            if self._py_logger is not None:
-                lvl = level.upper().strip()
-                if   lvl == 'DEBUG':   self._py_logger.debug(log_entry)
-                elif lvl == 'WARNING': self._py_logger.warning(log_entry)
-                elif lvl == 'ERROR':   self._py_logger.error(log_entry)
-                else:                  self._py_logger.info(log_entry)
-        except Exception:
-            pass
+        self._mbox.put_nowait((level, log_entry))
+    
+    def _drain(self):
+        """Vuelca los mensajes pendientes en bloque: una escritura de consola por lote"""
+        mbox = self._mbox
+        stop = False
+        while not stop:
+            batch = [mbox.get()]
+            try:
+                while True:
+                    batch.append(mbox.get_nowait())
+            except queue.Empty:
+                pass
+            # None es el centinela de _shutdown: escribir lo previo y terminar
+            if None in batch:
+                batch = [item for item in batch if item is not None]
+                stop = True
+                if not batch:
+                    break
+            # Consola
+            try:
+                print("\n".join(entry for _, entry in batch), flush=True)
+            except Exception:
+                pass
+            # Archivo (rotativo)
+            try:
+                if self._py_logger is not None:
+                    for level, log_entry in batch:
+                        lvl = level.upper().strip()
+                        if   lvl == 'DEBUG':   self._py_logger.debug(log_entry)
+                        elif lvl == 'WARNING': self._py_logger.warning(log_entry)
+                        elif lvl == 'ERROR':   self._py_logger.error(log_entry)
+                        else:                  self._py_logger.info(log_entry)
+            except Exception:
+                pass
     
+    def _shutdown(self, timeout: float = 2.0):
+        """Vacía el buzón pendiente al salir del intérprete"""
+        if self._drainer.is_alive():
+            self._mbox.put_nowait(None)
+            self._drainer.join(timeout)
+
     def get_logs(self) -> List[str]:
         """Obtiene todos los logs"""
         with self._lock:
@@ -277,19 +443,59 @@ app.jinja_loader = ChoiceLoader([
     FileSystemLoader(str(SHARED_TEMPLATES))   # Shared como fallback
 ])
 
+# Caché HTTP de assets estáticos (segundos); el navegador revalida con ETag al vencer
+STATIC_MAX_AGE = int(os.environ.get("OPUNO_STATIC_MAX_AGE", "300"))
+
+
+def _scan_static(root: Path) -> set:
+    """Rutas relativas (estilo URL) de los archivos bajo root."""
+    try:
+        return {p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file()}
+    except OSError:
+        return set()
+
+
+# Índice de assets al arrancar: resuelve el directorio sin excepciones como control de flujo
+_STATIC_FILES = _scan_static(STATIC_DIR)
+_SHARED_STATIC_FILES = _scan_static(SHARED_STATIC_DIR)
+
+
 @app.route('/static/<path:filename>')
 def custom_static(filename):
     """Serve static files with fallback to shared_static"""
-    try:
-        return send_from_directory(STATIC_DIR, filename)
-    except NotFound:
-        return send_from_directory(SHARED_STATIC_DIR, filename)
+    if filename in _STATIC_FILES:
+        return send_from_directory(STATIC_DIR, filename, max_age=STATIC_MAX_AGE)
+    if filename in _SHARED_STATIC_FILES:
+        return send_from_directory(SHARED_STATIC_DIR, filename, max_age=STATIC_MAX_AGE)
+    # Archivos creados después del arranque (desarrollo)
+    for root in (STATIC_DIR, SHARED_STATIC_DIR):
+        if os.path.isfile(os.path.join(root, filename)):
+            return send_from_directory(root, filename, max_age=STATIC_MAX_AGE)
+    abort(404)
 
 # Verbose flags (pueden habilitarse temporalmente para depurar)
 STATUS_DEBUG = False
 # Modelo lineal open-loop (sin sensor): parámetros configurables
 FLOW_DEADBAND_ENERGY = 0  # 0..255
 FLOW_CMAX_MLS = 50.0      # ml/s @ 255 por defecto
+# 1 / (255 - deadband): se recalcula solo cuando cambia el deadband
+_FLOW_INV_DEN = 1.0 / 255
+
+
+def _set_flow_deadband(db: float) -> int:
+    """Fija el deadband de energía (0..255) y su denominador precalculado."""
+    global FLOW_DEADBAND_ENERGY, _FLOW_INV_DEN
+    FLOW_DEADBAND_ENERGY = max(0, min(255, int(db)))
+    _FLOW_INV_DEN = 1.0 / max(1, 255 - FLOW_DEADBAND_ENERGY)
+    return FLOW_DEADBAND_ENERGY
+
+
+def _flow_from_energy(energy: int, cmax: float) -> float:
+    """Caudal estimado (ml/s, 0..cmax) para una energía de bomba: modelo lineal con deadband."""
+    db = FLOW_DEADBAND_ENERGY
+    if energy <= db or cmax <= 0.0:
+        return 0.0
+    return min(cmax, (energy - db) * _FLOW_INV_DEN * cmax)
 
 # Lock global para operaciones sobre el entorno
 env_lock = threading.Lock()
@@ -341,13 +547,26 @@ active_robot_id: Optional[str] = None
 shared_calendar: Optional[SharedCalendar] = None
 
 
+# robot_id -> (label, kind, is_virtual); ROBOT_PROFILES es fijo tras el arranque
+_profile_cache: Dict[str, tuple] = {}
+
+
+def _profile_for(robot_id: str) -> tuple:
+    t = _profile_cache.get(robot_id)
+    if t is None:
+        p = ROBOT_PROFILES.get(robot_id, {})
+        t = (p.get("label", robot_id), p.get("kind", "hardware"), bool(p.get("is_virtual", False)))
+        _profile_cache[robot_id] = t
+    return t
+
+
 def _runtime_summary(profile_id: str) -> Dict[str, Any]:
-    profile = ROBOT_PROFILES.get(profile_id, {})
+    label, kind, is_virtual = _profile_for(profile_id)
     return {
         "id": profile_id,
-        "label": profile.get("label", profile_id),
-        "kind": profile.get("kind", "hardware"),
-        "is_virtual": bool(profile.get("is_virtual", False)),
+        "label": label,
+        "kind": kind,
+        "is_virtual": is_virtual,
         "active": profile_id == active_robot_id,
         "serial_port": getattr(robot_env, "port", None),
     }
@@ -378,6 +597,7 @@ def _shutdown_runtime() -> None:
 
 def _start_runtime(profile_id: str) -> Dict[str, Any]:
     global robot_env, protocol_runner, task_executor, task_scheduler, active_robot_id
+    global _status_published
     profile = ROBOT_PROFILES[profile_id]
     env = profile["factory"]()
     runner = ProtocolRunner(
@@ -404,6 +624,9 @@ def _start_runtime(profile_id: str) -> Dict[str, Any]:
     task_executor = executor
     task_scheduler = scheduler
     active_robot_id = profile_id
+    # El estado publicado era del entorno anterior: los lectores lo arman
+    # hasta que status_update_loop publique el del nuevo
+    _status_published = None
     return profile
 
 
@@ -436,7 +659,13 @@ def reset_scheduler_defaults(lock_held: bool = False) -> None:
             logger.log(f"No se pudo desactivar scheduler al inicio: {exc}")
 
 
+# (entorno, mtime_ns de settings) de la última aplicación: si no cambió ninguno
+# de los dos no hay nada que reaplicar
+_settings_applied_key: Optional[tuple] = None
+
+
 def apply_persisted_settings(lock_held: bool = False) -> None:
+    global _settings_applied_key, FLOW_CMAX_MLS
     if robot_env is None:
         return
     ctx = nullcontext() if lock_held else env_lock
@@ -445,6 +674,9 @@ def apply_persisted_settings(lock_held: bool = False) -> None:
             return
         try:
             s = _load_settings_dict()
+            applied_key = (robot_env, _settings_cache["mtime_ns"])
+            if applied_key == _settings_applied_key:
+                return
             try:
                 if s.get("baudrate"):
                     robot_env.baudrate = int(s["baudrate"])
@@ -460,25 +692,17 @@ def apply_persisted_settings(lock_held: bool = False) -> None:
             try:
                 db = s.get("deadband_energy")
                 if db is not None:
-                    val = int(float(db))
-                    globals()["FLOW_DEADBAND_ENERGY"] = max(0, min(255, val))
-                    try:
-                        if hasattr(robot_env, 'set_deadband_energy'):
-                            robot_env.set_deadband_energy(globals()["FLOW_DEADBAND_ENERGY"])  # type: ignore[attr-defined]
-                    except Exception:
-                        pass
+                    _set_flow_deadband(float(db))
+                    if hasattr(robot_env, 'set_deadband_energy'):
+                        robot_env.set_deadband_energy(FLOW_DEADBAND_ENERGY)  # type: ignore[attr-defined]
             except Exception:
                 pass
             # Modelo de flujo (cmax ml/s @255). Si no hay settings, usar default
             try:
                 cm = s.get("caudal_bomba_mls")
-                if cm is None:
-                    cm = globals().get("FLOW_CMAX_MLS", 50.0)
-                globals()["FLOW_CMAX_MLS"] = max(0.0, float(cm))
-                try:
-                    robot_env.set_caudal_bomba_ml_s(globals()["FLOW_CMAX_MLS"])  # act[19]
-                except Exception:
-                    pass
+                if cm is not None:
+                    FLOW_CMAX_MLS = max(0.0, float(cm))
+                robot_env.set_caudal_bomba_ml_s(FLOW_CMAX_MLS)  # act[19]
             except Exception:
                 pass
             # Aplicar calibraciones persistidas de pasos
@@ -505,6 +729,7 @@ def apply_persisted_settings(lock_held: bool = False) -> None:
                     robot_env.set_scheduler_enabled(bool(s["scheduler_enabled"]))
             except Exception:
                 pass
+            _settings_applied_key = applied_key
             logger.log("Settings aplicados al iniciar")
         except Exception as exc:
             logger.log(f"WARNING: No se pudieron aplicar settings al inicio: {exc}")
@@ -547,23 +772,34 @@ logger.log(f"[SharedCalendar] Inicializado (tareas: {len(shared_calendar.get_all
 from reloj_core.calendar_api import register_calendar_routes
 register_calendar_routes(app, shared_calendar, logger.log)
 
+# Campos fijos de cada perfil; solo "active" depende del robot en uso
+_ROBOT_PROFILES_STATIC = tuple(
+    {
+        "id": rid,
+        "label": profile.get("label", rid),
+        "kind": profile.get("kind", "hardware"),
+        "is_virtual": bool(profile.get("is_virtual", False)),
+    }
+    for rid, profile in ROBOT_PROFILES.items()
+)
+# (active_robot_id, lista) de la última llamada; la lista se comparte (solo lectura)
+_robot_profiles_memo: Optional[tuple] = None
+
+
 def _available_robot_profiles() -> List[Dict[str, Any]]:
-    return [
-        {
-            "id": rid,
-            "label": profile.get("label", rid),
-            "kind": profile.get("kind", "hardware"),
-            "is_virtual": bool(profile.get("is_virtual", False)),
-            "active": rid == active_robot_id,
-        }
-        for rid, profile in ROBOT_PROFILES.items()
-    ]
+    global _robot_profiles_memo
+    active = active_robot_id
+    memo = _robot_profiles_memo
+    if memo is None or memo[0] != active:
+        memo = (active, [{**d, "active": d["id"] == active} for d in _ROBOT_PROFILES_STATIC])
+        _robot_profiles_memo = memo
+    return memo[1]
 
 
 @app.route("/api/robots", methods=["GET"])
 def api_list_robots():
     """Lista los perfiles disponibles y cuál está activo."""
-    return jsonify({
+    return _jsonify({
         "active": active_robot_id,
         "robots": _available_robot_profiles(),
     })
@@ -594,32 +830,60 @@ def api_select_robot():
 # Estado del robot y caché del último válido
 robot_status = RobotStatus()
 last_status_cache: Optional[RobotStatus] = None
+# Último estado armado (fresco o stale) que publica status_update_loop, único
+# consumidor de la cola RX; los demás lo leen sin competir por frames
+_status_published: Optional[RobotStatus] = None
+_status_loop_running = False
+# Serializa el armado: _vol_state/_est_vol y last_status_cache con un solo escritor
+_status_build_lock = threading.Lock()
+# Señal de estado fresco para los streams: _status_seq crece con cada RX nuevo
+_status_cond = threading.Condition()
+_status_seq = 0
 
 visualizer: Optional["PyBulletVisualizer"] = None
 # --------- DEBUG SERIAL ---------
 last_rx_text = ""
 last_rx_ts = 0.0
+# Última observación RX sin formatear: (ts, valores). El camino de lectura solo
+# hace un append; el texto se arma al consultar /api/debug/serial
+_rx_pending: deque = deque(maxlen=1)
 
 # último comando TX enviado al robot
 last_tx_text = ""
 last_tx_ts = 0.0
 
 # --------- PyBullet GUI external process management ---------
+# El proceso arranca en modo --standby (imports ya cargados) y se le ordena
+# mostrar/ocultar la ventana por stdin; solo se termina al apagar el server
+PB_GUI_PREWARM = os.environ.get("OPUNO_PB_GUI_PREWARM", "1") != "0"
+PB_GUI_SCRIPT = (BASE_DIR.parent / "pybullet_virtual_gui.py").resolve()
+PB_GUI_SCRIPT_OK = PB_GUI_SCRIPT.is_file()
 _pb_gui_proc: Optional[subprocess.Popen] = None
+# Lo mantiene un hilo vigía que espera al proceso; evita un poll() por consulta
+_pb_gui_alive = False
+_pb_gui_shown = False
+_pb_gui_lock = threading.Lock()
+
+def _pb_gui_watch(proc: subprocess.Popen) -> None:
+    global _pb_gui_alive, _pb_gui_shown
+    try:
+        proc.wait()
+    except Exception:
+        pass
+    if _pb_gui_proc is proc:
+        _pb_gui_alive = False
+        _pb_gui_shown = False
 
 def _pb_gui_is_running() -> bool:
-    global _pb_gui_proc
-    return _pb_gui_proc is not None and _pb_gui_proc.poll() is None
+    return _pb_gui_alive and _pb_gui_shown
 
-def _pb_gui_start() -> bool:
-    global _pb_gui_proc
-    if _pb_gui_is_running():
-        return True
+def _pb_gui_spawn() -> bool:
+    """Lanza el proceso en standby. Requiere _pb_gui_lock."""
+    global _pb_gui_proc, _pb_gui_alive, _pb_gui_shown
+    if not PB_GUI_SCRIPT_OK:
+        logger.log(f"[PyBullet GUI] Script no encontrado: {PB_GUI_SCRIPT}", "WARNING")
+        return False
     try:
-        script = (BASE_DIR.parent / "pybullet_virtual_gui.py").resolve()
-        if not script.exists():
-            logger.log(f"[PyBullet GUI] Script no encontrado: {script}", "WARNING")
-            return False
         creationflags = 0
         # En Windows, evitar que bloquee la consola del server
         if sys.platform.startswith("win"):
@@ -628,39 +892,97 @@ def _pb_gui_start() -> bool:
             except Exception:
                 creationflags = 0
         _pb_gui_proc = subprocess.Popen(
-            [sys.executable, str(script)],
+            [sys.executable, str(PB_GUI_SCRIPT), "--standby"],
             cwd=str(BASE_DIR.parent),
+            stdin=subprocess.PIPE,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.STDOUT,
             start_new_session=(not sys.platform.startswith("win")),
             creationflags=creationflags,
         )
-        logger.log("[PyBullet GUI] Proceso iniciado")
+        _pb_gui_alive = True
+        _pb_gui_shown = False
+        threading.Thread(target=_pb_gui_watch, args=(_pb_gui_proc,), daemon=True).start()
+        logger.log("[PyBullet GUI] Proceso iniciado (standby)")
         return True
     except Exception as exc:
         logger.log(f"[PyBullet GUI] Error al iniciar: {exc}", "WARNING")
         _pb_gui_proc = None
+        _pb_gui_alive = False
         return False
 
-def _pb_gui_stop() -> bool:
-    global _pb_gui_proc
-    if not _pb_gui_is_running():
-        _pb_gui_proc = None
+def _pb_gui_send(cmd: str) -> bool:
+    """Envía un comando (show/hide/exit) al proceso. Requiere _pb_gui_lock."""
+    proc = _pb_gui_proc
+    if proc is None or proc.stdin is None:
+        return False
+    try:
+        proc.stdin.write(cmd.encode("ascii") + b"\n")
+        proc.stdin.flush()
+        return True
+    except Exception as exc:
+        logger.log(f"[PyBullet GUI] No se pudo enviar '{cmd}': {exc}", "WARNING")
+        return False
+
+def _pb_gui_terminate() -> bool:
+    """Termina el proceso. Requiere _pb_gui_lock."""
+    global _pb_gui_proc, _pb_gui_alive, _pb_gui_shown
+    if _pb_gui_proc is None:
+        _pb_gui_alive = _pb_gui_shown = False
         return True
     try:
-        assert _pb_gui_proc is not None
-        _pb_gui_proc.terminate()
+        _pb_gui_send("exit")
         try:
             _pb_gui_proc.wait(timeout=2.0)
         except Exception:
-            _pb_gui_proc.kill()
+            _pb_gui_proc.terminate()
+            try:
+                _pb_gui_proc.wait(timeout=2.0)
+            except Exception:
+                _pb_gui_proc.kill()
         logger.log("[PyBullet GUI] Proceso detenido")
         _pb_gui_proc = None
+        _pb_gui_alive = _pb_gui_shown = False
         return True
     except Exception as exc:
         logger.log(f"[PyBullet GUI] Error al detener: {exc}", "WARNING")
         return False
 
+def _pb_gui_prewarm() -> bool:
+    """Deja un proceso en standby para que abrir la GUI sea inmediato."""
+    with _pb_gui_lock:
+        return _pb_gui_alive or _pb_gui_spawn()
+
+def _pb_gui_start() -> bool:
+    global _pb_gui_shown
+    with _pb_gui_lock:
+        if _pb_gui_is_running():
+            return True
+        if not _pb_gui_alive and not _pb_gui_spawn():
+            return False
+        if not _pb_gui_send("show"):
+            return False
+        _pb_gui_shown = True
+        logger.log("[PyBullet GUI] Ventana abierta")
+        return True
+
+def _pb_gui_stop() -> bool:
+    global _pb_gui_shown
+    with _pb_gui_lock:
+        if not _pb_gui_is_running():
+            return True
+        if _pb_gui_send("hide"):
+            _pb_gui_shown = False
+            logger.log("[PyBullet GUI] Ventana cerrada (proceso en standby)")
+            return True
+        return _pb_gui_terminate()
+
+def _pb_gui_shutdown() -> None:
+    with _pb_gui_lock:
+        _pb_gui_terminate()
+
+atexit.register(_pb_gui_shutdown)
+
 
 @app.route("/api/pybullet/frame")
 def api_pybullet_frame():
@@ -668,15 +990,23 @@ def api_pybullet_frame():
     if visualizer is None:
         return jsonify({"error": "pybullet_unavailable"}), 404
     try:
-        frame = visualizer.render_frame()
+        frame, seq = visualizer.render_frame_seq()
     except Exception as exc:
         logger.log(f"[Visualizer] Error renderizando frame: {exc}", "WARNING")
-        frame = None
+        frame, seq = None, -1
     if not frame:
         return jsonify({"error": "no_frame"}), 503
+    # ETag por instancia del visualizador + escena: si el cliente ya tiene este
+    # frame se responde 304 sin cuerpo
+    etag = f'"{id(visualizer):x}-{seq}"'
+    if request.headers.get("If-None-Match") == etag:
+        resp = make_response("", 304)
+        resp.headers["ETag"] = etag
+        return resp
     resp = make_response(frame)
     resp.headers["Content-Type"] = getattr(visualizer, "mimetype", "image/jpeg")
-    resp.headers["Cache-Control"] = "no-store, max-age=0"
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = "no-cache"
     resp.headers["Pragma"] = "no-cache"
     resp.headers["Expires"] = "0"
     return resp
@@ -684,19 +1014,51 @@ def api_pybullet_frame():
 def _set_last_rx(txt: str):
     global last_rx_text
     global last_rx_ts
+    _rx_pending.clear()
     last_rx_text = txt.strip(); last_rx_ts = time.time()
 
 
+def _set_last_rx_values(values: List[float], now: Optional[float] = None):
+    """Registra la última observación RX; el formateo se difiere a la lectura."""
+    global last_rx_ts
+    if now is None:
+        now = time.time()
+    _rx_pending.append((now, values))
+    last_rx_ts = now
+
+
+# Formato "%.2f %.2f ..." por cantidad de valores: un solo % por observación
+_rx_formats: Dict[int, str] = {}
+
+
+def _rx_snapshot() -> tuple:
+    """Devuelve (texto, ts) del último RX, formateando la observación pendiente."""
+    global last_rx_text
+    try:
+        ts, values = _rx_pending.pop()
+    except IndexError:
+        return last_rx_text, last_rx_ts
+    fmt = _rx_formats.get(len(values))
+    if fmt is None:
+        fmt = _rx_formats[len(values)] = " ".join(["%.2f"] * len(values))
+    last_rx_text = fmt % tuple(values)
+    return last_rx_text, ts
+
+
 def _set_last_tx(txt: str):
     global last_tx_text, last_tx_ts
     last_tx_text = txt.strip(); last_tx_ts = time.time()
 
 
+# Campos derivados del último RX/TX, recalculados solo cuando cambia el mensaje:
+# kind -> (ts, text, ts_iso, lines)
+_serial_debug_cache: Dict[str, tuple] = {}
+
+
 def _serial_debug_payload(kind: str) -> Dict[str, Any]:
     """Construye el payload de depuración RX/TX."""
     if kind == "rx":
-        text = last_rx_text
-        ts = last_rx_ts
+        text, ts = _rx_snapshot()
         field = "last_rx"
     else:
         text = last_tx_text
@@ -708,13 +1070,20 @@ def _serial_debug_payload(kind: str) -> Dict[str, Any]:
         "age_ms": age_ms,
         "ts": ts or None,
     }
+    cached = _serial_debug_cache.get(kind)
+    if cached is None or cached[0] != ts or cached[1] is not text:
+        ts_iso = None
+        if ts:
+            try:
+                ts_iso = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+            except Exception:
+                ts_iso = datetime.utcfromtimestamp(ts).isoformat()  # type: ignore[attr-defined]
+        cached = (ts, text, ts_iso, tuple(text.splitlines()) if text else ())
+        _serial_debug_cache[kind] = cached
     if ts:
-        try:
-            payload["ts_iso"] = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
-        except Exception:
-            payload["ts_iso"] = datetime.utcfromtimestamp(ts).isoformat()  # type: ignore[attr-defined]
+        payload["ts_iso"] = cached[2]
     if text:
-        payload["lines"] = text.splitlines()
+        payload["lines"] = list(cached[3])
         payload["chars"] = len(text)
     else:
         payload["lines"] = []
@@ -728,288 +1097,308 @@ def _serial_debug_payload(kind: str) -> Dict[str, Any]:
 # FUNCIONES AUXILIARES
 # =============================================================================
 
+# Estado entre ticks para derivar caudal: [ts, volumen_ml] de la última muestra
+_vol_state: List[float] = [0.0, 0.0]
+# Estimador local de volumen sin sensor de flujo
+_est_vol: Dict[str, float] = {"ts": 0.0, "vol": 0.0}
+
+
 def get_robot_status(force_fresh=False) -> RobotStatus:
-    global last_status_cache
-    # Variables para derivar caudal
+    """Estado actual del robot (solo lectura: puede ser el objeto publicado).
+
+    Con status_update_loop corriendo devuelve lo último que publicó; con
+    force_fresh espera antes hasta ~300ms por el próximo RX fresco. Sin el
+    hilo (arranque) arma el estado en el momento.
+    """
+    if _status_loop_running:
+        if force_fresh:
+            _wait_status_fresh(_status_seq, 0.3)
+        status = _status_published
+        if status is not None:
+            return status
+    with _status_build_lock:
+        return _build_robot_status(force_fresh)
+
+
+def _build_robot_status(force_fresh=False) -> RobotStatus:
+    """Lee RX y arma el estado; llamar con _status_build_lock tomado."""
+    global last_status_cache, _status_published
     global last_rx_ts
-    if not hasattr(get_robot_status, "_last_vol_ts"):
-        setattr(get_robot_status, "_last_vol_ts", 0.0)
-        setattr(get_robot_status, "_last_vol_ml", 0.0)
-    """Obtiene el estado actual del robot de forma segura y sin evaluar arrays como booleanos."""
 
     status = RobotStatus()  # instancia nueva cada llamada
     obs_list: Optional[List[float]] = None
     try:
+        # Solo se toma la referencia al entorno bajo el lock (switch_robot puede
+        # reemplazarlo); la espera de RX y el armado del estado no bloquean a
+        # los endpoints que escriben en el robot
         with env_lock:
-            # Obtener observación cruda
-            obs_arr = robot_env._obs_now()
-            data_fresh = True
+            env = robot_env
+        # Obtener observación cruda: vaciar la cola sin bloquear y quedarse con
+        # la más nueva (las anteriores ya están viejas)
+        rx_q = env.q
+        obs_arr = rx_q.get_latest()
+        data_fresh = True
+        if obs_arr is None:
+            # Espera breve por RX (hasta ~300ms) antes de decidir caché
+            try:
+                obs_arr = rx_q.get(timeout=0.3)
+            except queue.Empty:
+                obs_arr = None
             if obs_arr is None:
-                # Espera breve por RX (hasta ~300ms) antes de decidir caché
-                waited = 0
-                while obs_arr is None and waited < 3:
-                    try:
-                        obs_arr = robot_env.q.get(timeout=0.1)
-                    except Exception:
-                        obs_arr = None
-                    waited += 1
-                if obs_arr is None:
-                    data_fresh = False
-
-            if data_fresh or force_fresh:
-                if obs_arr is not None:
-                    obs_list = obs_arr.tolist()
-                    _set_last_rx(" ".join(f"{v:.2f}" for v in obs_list))
-                    if STATUS_DEBUG:
-                        print(f"[DEBUG] get_robot_status: Datos frescos - X={obs_list[0]}, A={obs_list[1]}, Z={obs_list[21] if len(obs_list) > 21 else 'N/A'}")
-                else:
-                    if STATUS_DEBUG:
-                        print("[DEBUG] get_robot_status: No hay datos frescos disponibles")
-                    obs_list = [0.0]*21
+                data_fresh = False
+        # Un solo reloj por tick: rx_age, dt del caudal y del estimador coinciden
+        now_ts = time.time()
+
+        if data_fresh or force_fresh:
+            if obs_arr is not None:
+                obs_list = obs_arr.tolist()
+                _set_last_rx_values(obs_list, now_ts)
+                if STATUS_DEBUG:
+                    print(f"[DEBUG] get_robot_status: Datos frescos - X={obs_list[0]}, A={obs_list[1]}, Z={obs_list[21] if len(obs_list) > 21 else 'N/A'}")
             else:
-                # Sin RX reciente: usar caché si existe para mantener valores previos
-                if last_status_cache is not None:
-                    cached_dict = asdict(last_status_cache)
-                    cached_dict["stale"] = True
-                    try:
-                        cached_dict["rx_age_ms"] = int(max(0.0, time.time() - last_rx_ts) * 1000)
-                    except Exception:
-                        cached_dict["rx_age_ms"] = 0
-                    status = RobotStatus(**cached_dict)
-                    if STATUS_DEBUG:
-                        print(f"[DEBUG] get_robot_status: Usando caché - X={status.x_mm}, A={status.a_deg}")
-                else:
-                    obs_list = [0.0]*21
-                    if STATUS_DEBUG:
-                        print("[DEBUG] get_robot_status: Usando valores por defecto (ceros)")
-
-            # Conexión serial actual
-            ser = getattr(robot_env, "ser", None)
-            status.serial_open = bool(ser and ser.is_open)
-            status.serial_port = robot_env.port
-            try:
-                status.baudrate = int(getattr(robot_env, 'baudrate', DEFAULT_BAUDRATE) or DEFAULT_BAUDRATE)
-            except Exception:
-                status.baudrate = DEFAULT_BAUDRATE
+                if STATUS_DEBUG:
+                    print("[DEBUG] get_robot_status: No hay datos frescos disponibles")
+                obs_list = [0.0]*21
+        else:
+            # Sin RX reciente: usar caché si existe para mantener valores previos
+            if last_status_cache is not None:
+                try:
+                    rx_age_ms = int(max(0.0, now_ts - last_rx_ts) * 1000)
+                except Exception:
+                    rx_age_ms = 0
+                # Copia directa del caché (sin pasar por dict)
+                status = replace(last_status_cache, stale=True, rx_age_ms=rx_age_ms)
+                if STATUS_DEBUG:
+                    print(f"[DEBUG] get_robot_status: Usando caché - X={status.x_mm}, A={status.a_deg}")
+            else:
+                obs_list = [0.0]*21
+                if STATUS_DEBUG:
+                    print("[DEBUG] get_robot_status: Usando valores por defecto (ceros)")
+
+        # Conexión serial actual
+        ser = getattr(env, "ser", None)
+        status.serial_open = bool(ser and ser.is_open)
+        status.serial_port = env.port
+        try:
+            status.baudrate = int(getattr(env, 'baudrate', DEFAULT_BAUDRATE) or DEFAULT_BAUDRATE)
+        except Exception:
+            status.baudrate = DEFAULT_BAUDRATE
+
+        valor_bomba_rx: Optional[float] = None
+        if obs_list is not None and len(obs_list) >= 21:
+            # obs_list viene de tolist(): ya son floats de Python, un solo desempaquetado
+            (x_mm, a_deg, valor_bomba_rx, volumen_ml, lim_x, lim_a, homing_x, homing_a,
+             _, _, _, modo,
+             kpX, kiX, kdX, kpA, kiA, kdA,           # PID gains desde RX (indices 12..17)
+             pasos_mm, pasos_grado) = obs_list[:20]  # Calibraciones (si el firmware las reporta)
+            status.x_mm       = x_mm
+            status.a_deg      = a_deg
+            status.volumen_ml = volumen_ml
+            status.lim_x      = int(lim_x)
+            status.lim_a      = int(lim_a)
+            status.homing_x   = int(homing_x)
+            status.homing_a   = int(homing_a)
+            status.modo       = int(modo)
+            status.kpX, status.kiX, status.kdX = kpX, kiX, kdX
+            status.kpA, status.kiA, status.kdA = kpA, kiA, kdA
+            status.pasosPorMM    = pasos_mm
+            status.pasosPorGrado = pasos_grado
+        had_z_from_rx = False
+        if obs_list is not None and len(obs_list) >= 22:
+            status.z_mm = obs_list[21]
+            had_z_from_rx = True
+
+        # Una sola copia del vector TX: lecturas coherentes aunque un endpoint lo
+        # modifique en paralelo, sin tomar env_lock
+        try:
+            act_snap: Optional[List[float]] = env.act.tolist()
+        except Exception:
+            act_snap = None
 
-            valor_bomba_rx: Optional[float] = None
-            if obs_list is not None and len(obs_list) >= 21:
-                status.x_mm       = float(obs_list[0])
-                status.a_deg      = float(obs_list[1])
+        # Energías y Z desde el último comando TX (vector de acción actual)
+        try:
+            act = act_snap
+            if act is not None and len(act) >= 4:
+                # ALIAS: energiaA=1, energiaX=2, energiaBomba=3
+                bomba_eff = int(act[3])
                 try:
-                    valor_bomba_rx = float(obs_list[2])
+                    if valor_bomba_rx is not None:
+                        bomba_eff = int(round(valor_bomba_rx))
                 except Exception:
-                    valor_bomba_rx = None
-                status.volumen_ml = float(obs_list[3])
-                status.lim_x      = int(obs_list[4])
-                status.lim_a      = int(obs_list[5])
-                status.homing_x   = int(obs_list[6])
-                status.homing_a   = int(obs_list[7])
-                status.modo       = int(obs_list[11])
-                # PID gains desde RX (indices 12..17)
-                status.kpX        = float(obs_list[12])
-                status.kiX        = float(obs_list[13])
-                status.kdX        = float(obs_list[14])
-                status.kpA        = float(obs_list[15])
-                status.kiA        = float(obs_list[16])
-                status.kdA        = float(obs_list[17])
-                # Calibraciones desde RX (si el firmware las reporta)
-                status.pasosPorMM    = float(obs_list[18])
-                status.pasosPorGrado = float(obs_list[19])
-            had_z_from_rx = False
-            if obs_list is not None:
+                    pass
+                status.energy_x = int(act[2])
+                status.energy_a = int(act[1])
+                status.energy_bomba = bomba_eff
+                # Volumen objetivo (índice 6)
                 try:
-                    if len(obs_list) >= 22:
-                        status.z_mm = float(obs_list[21])
-                        had_z_from_rx = True
+                    if len(act) >= 7:
+                        status.volumen_objetivo_ml = float(act[6])
                 except Exception:
                     pass
-
-            # Energías y Z desde el último comando TX (vector de acción actual)
-            try:
-                act = getattr(robot_env, 'act', None)
-                if act is not None and len(act) >= 4:
-                    # ALIAS: energiaA=1, energiaX=2, energiaBomba=3
-                    bomba_eff = int(act[3])
+                # Servo Z (ángulo en índice 20 y velocidad en 21)
+                # Ya no forzamos servo_z_deg si reportamos z_mm
+                # Exponer flags/flujo desde TX actuales
+                if len(act) >= 20:
                     try:
-                        if valor_bomba_rx is not None:
-                            bomba_eff = int(round(valor_bomba_rx))
+                        status.usarSensorFlujo = int(act[18])
                     except Exception:
-                        pass
-                    status.energies = {
-                        "x": int(act[2]),
-                        "a": int(act[1]),
-                        "bomba": bomba_eff,
-                    }
-                    # Volumen objetivo (índice 6)
+                        status.usarSensorFlujo = 0
                     try:
-                        if len(act) >= 7:
-                            status.volumen_objetivo_ml = float(act[6])
+                        status.caudalBombaMLs = float(act[19])
                     except Exception:
-                        pass
-                    # Servo Z (ángulo en índice 20 y velocidad en 21)
-                    # Ya no forzamos servo_z_deg si reportamos z_mm
-                    # Exponer flags/flujo desde TX actuales
-                    if len(act) >= 20:
-                        try:
-                            status.usarSensorFlujo = int(act[18])
-                        except Exception:
-                            status.usarSensorFlujo = 0
-                        try:
-                            status.caudalBombaMLs = float(act[19])
-                        except Exception:
-                            status.caudalBombaMLs = 0.0
-            except Exception:
-                pass
+                        status.caudalBombaMLs = 0.0
+        except Exception:
+            pass
+
+        # Alias de compatibilidad para la UI
+        # Derivar caudal si es posible
+        flow_target_est: Optional[float] = None
+        try:
+            prev_ts, prev_vol = _vol_state
+            allow_deriv = prev_ts and now_ts > prev_ts
+            if allow_deriv:
+                dvol = max(0.0, status.volumen_ml - prev_vol)
+                dt = now_ts - prev_ts
+                deriv = dvol / dt if dt > 0 else 0.0
+                if status.usarSensorFlujo or getattr(env, "is_virtual", False):
+                    status.caudal_est_mls = float(deriv)
+                else:
+                    # Sin sensor: estimar desde energía proporcional (no asumir cmax completa)
+                    try:
+                        e = abs(status.energy_bomba)
+                        cmax = float(status.caudalBombaMLs or 0.0) or float(FLOW_CMAX_MLS)
+                        status.caudal_est_mls = _flow_from_energy(e, cmax)
+                        if cmax > 0:
+                            # Mismo e/cmax que el objetivo de abajo: reutilizar
+                            flow_target_est = status.caudal_est_mls
+                    except Exception:
+                        status.caudal_est_mls = 0.0
+            _vol_state[0] = now_ts
+            _vol_state[1] = status.volumen_ml
+        except Exception:
+            pass
 
-            # Alias de compatibilidad para la UI
-            # Derivar caudal si es posible
+        # Estimador local cuando no hay sensor de flujo (para telemetría/UI)
+        if not getattr(env, "is_virtual", False):
             try:
-                now_ts = time.time()
-                prev_ts = getattr(get_robot_status, "_last_vol_ts")
-                prev_vol = getattr(get_robot_status, "_last_vol_ml")
-                allow_deriv = prev_ts and now_ts > prev_ts
-                if allow_deriv:
-                    dvol = max(0.0, status.volumen_ml - prev_vol)
-                    dt = now_ts - prev_ts
-                    deriv = dvol / dt if dt > 0 else 0.0
-                    if status.usarSensorFlujo or getattr(robot_env, "is_virtual", False):
-                        status.caudal_est_mls = float(deriv)
+                est = _est_vol
+                bomba_activa = bool(status.energy_bomba)
+                if status.usarSensorFlujo:
+                    est["vol"] = status.volumen_ml
+                    est["ts"] = now_ts
+                else:
+                    if bomba_activa and status.caudalBombaMLs > 0:
+                        if est["ts"] == 0:
+                            est["vol"] = status.volumen_ml
+                            est["ts"] = now_ts
+                        else:
+                            dt = max(0.0, now_ts - est["ts"])
+                            est["ts"] = now_ts
+                            est["vol"] = max(status.volumen_ml, est["vol"] + status.caudalBombaMLs * dt)
+                        status.caudal_est_mls = float(status.caudalBombaMLs)
+                        status.flow_est = status.caudal_est_mls
+                        status.volumen_ml = est["vol"]
                     else:
-                        # Sin sensor: estimar desde energía proporcional (no asumir cmax completa)
-                        try:
-                            e = abs(int(status.energies.get("bomba", 0)))
-                            db = int(globals().get("FLOW_DEADBAND_ENERGY", 0))
-                            cmax = float(status.caudalBombaMLs or 0.0) or float(globals().get("FLOW_CMAX_MLS", 50.0))
-                            alpha = 0.0 if e <= db else float(e - db) / float(max(1, 255 - db))
-                            status.caudal_est_mls = float(max(0.0, min(cmax, alpha * cmax)))
-                        except Exception:
-                            status.caudal_est_mls = 0.0
-                setattr(get_robot_status, "_last_vol_ts", now_ts)
-                setattr(get_robot_status, "_last_vol_ml", status.volumen_ml)
+                        est["vol"] = status.volumen_ml
+                        est["ts"] = now_ts
             except Exception:
                 pass
 
-            # Estimador local cuando no hay sensor de flujo (para telemetría/UI)
-            if not getattr(robot_env, "is_virtual", False):
-                try:
-                    if not hasattr(get_robot_status, "_est_vol"):
-                        setattr(get_robot_status, "_est_vol", {
-                            "ts": 0.0,
-                            "vol": 0.0,
-                        })
-                    est = getattr(get_robot_status, "_est_vol")
-                    now_est = time.time()
-                    bomba_activa = bool(status.energies.get("bomba", 0))
-                    if status.usarSensorFlujo:
-                        est["vol"] = status.volumen_ml
-                        est["ts"] = now_est
-                    else:
-                        if bomba_activa and status.caudalBombaMLs > 0:
-                            if est["ts"] == 0:
-                                est["vol"] = status.volumen_ml
-                                est["ts"] = now_est
-                            else:
-                                dt = max(0.0, now_est - est["ts"])
-                                est["ts"] = now_est
-                                est["vol"] = max(status.volumen_ml, est["vol"] + status.caudalBombaMLs * dt)
-                            status.caudal_est_mls = float(status.caudalBombaMLs)
-                            status.flow_est = status.caudal_est_mls
-                            status.volumen_ml = est["vol"]
-                        else:
-                            est["vol"] = status.volumen_ml
-                            est["ts"] = now_est
-                except Exception:
-                    pass
-
-            status.flow_est = float(status.caudal_est_mls or 0.0)
-            try:
-                status.volumen_restante_ml = max(0.0, float(status.volumen_objetivo_ml) - float(status.volumen_ml))
-            except Exception:
-                status.volumen_restante_ml = 0.0
-            # Campos de conveniencia (uniformes)
-            try:
-                exec_on = bool(int(status.modo) & 0x08)
-            except Exception:
-                exec_on = False
-            try:
-                margin = float(getattr(status, 'objective_margin_ml', 0.05) or 0.05)
-            except Exception:
-                margin = 0.05
-            try:
-                status.objective_pending = bool(status.volumen_restante_ml > margin)
-            except Exception:
-                status.objective_pending = False
-            try:
-                status.running = bool((status.caudal_est_mls or 0.0) > 0.01 or (exec_on and status.objective_pending))
-            except Exception:
-                status.running = False
-            # Estimar objetivo de flujo desde energía (modo sin sensor)
-            try:
-                usar_sens = bool(status.usarSensorFlujo)
-            except Exception:
-                usar_sens = False
+        status.flow_est = float(status.caudal_est_mls or 0.0)
+        try:
+            status.volumen_restante_ml = max(0.0, float(status.volumen_objetivo_ml) - float(status.volumen_ml))
+        except Exception:
+            status.volumen_restante_ml = 0.0
+        # Campos de conveniencia (uniformes)
+        # modo ya es int y los campos float tienen valor por defecto en RobotStatus
+        exec_on = bool(status.modo & 0x08)
+        margin = status.objective_margin_ml or 0.05
+        status.objective_pending = status.volumen_restante_ml > margin
+        status.running = (status.caudal_est_mls or 0.0) > 0.01 or (exec_on and status.objective_pending)
+        # Estimar objetivo de flujo desde energía (modo sin sensor)
+        try:
+            usar_sens = bool(status.usarSensorFlujo)
+        except Exception:
+            usar_sens = False
+        if usar_sens:
+            status.flow_target_est_mls = 0.0
+        elif flow_target_est is not None:
+            status.flow_target_est_mls = flow_target_est
+        else:
             try:
-                db = globals().get('FLOW_DEADBAND_ENERGY', 0)
                 cmax = 0.0
-                act = getattr(robot_env, 'act', None)
+                act = act_snap
                 if act is not None and len(act) > 19:
                     cmax = float(act[19])
                 if not cmax or cmax <= 0:
-                    cmax = float(globals().get('FLOW_CMAX_MLS', 50.0))
-                e = abs(int(status.energies.get('bomba', 0)))
-                alpha = 0.0 if e <= db else (float(e - db) / float(max(1, 255 - db)))
-                status.flow_target_est_mls = 0.0 if usar_sens else max(0.0, min(cmax, alpha * cmax))
+                    cmax = float(FLOW_CMAX_MLS)
+                e = abs(status.energy_bomba)
+                status.flow_target_est_mls = _flow_from_energy(e, cmax)
             except Exception:
                 status.flow_target_est_mls = 0.0
-            profile = ROBOT_PROFILES.get(active_robot_id or "real", {})
-            status.robot_id = active_robot_id or "real"
-            status.robot_label = profile.get("label", status.robot_id)
-            status.robot_kind = profile.get("kind", "hardware")
-            status.is_virtual = bool(profile.get("is_virtual", False))
-            # Si no hay z_mm en RX, calcular desde TX/deg como fallback
-            try:
-                if not had_z_from_rx:
-                    # Intentar con TX actual deg
-                    act = getattr(robot_env, 'act', None)
-                    if act is not None and len(act) >= 21:
-                        deg = float(act[20])
-                        settings = _load_settings_dict()
-                        z_scale = float(settings.get('z_mm_por_grado', getattr(robot_env, 'z_mm_por_grado', 1.0) or 1.0))
-                        status.z_mm = max(0.0, (180.0 - deg) * z_scale)
-            except Exception:
-                pass
+        status.robot_id = active_robot_id or "real"
+        status.robot_label, status.robot_kind, status.is_virtual = _profile_for(status.robot_id)
+        # Si no hay z_mm en RX, calcular desde TX/deg como fallback
+        try:
+            if not had_z_from_rx:
+                # Intentar con TX actual deg
+                act = act_snap
+                if act is not None and len(act) >= 21:
+                    deg = float(act[20])
+                    # El entorno ya tiene z_mm_por_grado de settings (apply_persisted_settings
+                    # y /api/settings lo actualizan): sin leer el archivo por tick
+                    z_scale = float(getattr(env, 'z_mm_por_grado', 1.0) or 1.0)
+                    status.z_mm = max(0.0, (180.0 - deg) * z_scale)
+        except Exception:
+            pass
 
-            # Edad de RX
-            try:
-                status.rx_age_ms = int(max(0.0, time.time() - last_rx_ts) * 1000)
-            except Exception:
-                status.rx_age_ms = 0
+        # Edad de RX
+        try:
+            status.rx_age_ms = int(max(0.0, now_ts - last_rx_ts) * 1000)
+        except Exception:
+            status.rx_age_ms = 0
 
-            # Agregar reward del protocolo activo
-            try:
-                st = protocol_runner.status()
-                if st.activo and st.last_reward is not None:
-                    status.reward = float(st.last_reward)
-                else:
-                    status.reward = 0.0
-            except Exception:
+        # Agregar reward del protocolo activo
+        try:
+            st = protocol_runner.status()
+            if st.activo and st.last_reward is not None:
+                status.reward = float(st.last_reward)
+            else:
                 status.reward = 0.0
+        except Exception:
+            status.reward = 0.0
 
-            # Actualizar caché solo cuando los datos son frescos
-            status.stale = not data_fresh
-            if data_fresh:
-                last_status_cache = status
+        # Actualizar caché solo cuando los datos son frescos
+        status.stale = not data_fresh
+        _status_published = status
+        if data_fresh:
+            last_status_cache = status
+            _publish_status_fresh()
 
-            if visualizer is not None:
-                try:
-                    visualizer.update_from_status(status)
-                except Exception as exc:
-                    logger.log(f"[Visualizer] Error actualizando escena: {exc}", "WARNING")
+        # El visualizador tiene su propio lock; no hace falta env_lock
+        if visualizer is not None:
+            try:
+                visualizer.update_from_status(status)
+            except Exception as exc:
+                logger.log(f"[Visualizer] Error actualizando escena: {exc}", "WARNING")
     except Exception as e:
         logger.log(f"Error obteniendo estado del robot: {e}", "ERROR")
     return status
 
+def _publish_status_fresh() -> None:
+    global _status_seq
+    with _status_cond:
+        _status_seq += 1
+        _status_cond.notify_all()
+
+
+def _wait_status_fresh(last_seq: int, timeout: float) -> int:
+    """Espera un estado fresco posterior a last_seq (o timeout); devuelve el seq actual."""
+    with _status_cond:
+        _status_cond.wait_for(lambda: _status_seq != last_seq, timeout)
+        return _status_seq
+
+
 def _is_serial_connected() -> bool:
     """Indica si el puerto serial está abierto, o si estamos en modo virtual."""
     try:
@@ -1053,12 +1442,7 @@ def stop_all_actuators():
     """
     with env_lock:
         try:
-            robot_env.set_energia_corredera(0)
-            robot_env.set_energia_angulo(0)
-            robot_env.set_energia_bomba(0)
-            robot_env.set_volumen_objetivo_ml(0)
-            robot_env.set_modo(cod=3)
-            robot_env.step()
+            robot_env.set_stop_state()
         except Exception as e:
             logger.log(f"[stop_all_actuators] Error apagando actuadores: {e}", "ERROR")
 
@@ -1091,6 +1475,9 @@ ALLOWED_PREFIXES = (
     "/hub",
 )
 
+# Prefijos siempre permitidos por restrict_endpoints (incluye /ws/ y el favicon)
+_ALLOWED_PATH_PREFIXES = tuple(ALLOWED_PREFIXES) + ("/ws/", "/favicon.ico")
+
 ENFORCE_ENDPOINT_FILTER = False
 
 @app.before_request
@@ -1098,14 +1485,11 @@ def restrict_endpoints():
     if not ENFORCE_ENDPOINT_FILTER:
         return
     path = request.path
-    upgrade = request.headers.get("Upgrade", "").lower()
-    if path.startswith("/ws/") or upgrade == "websocket":
-        return
-    if path in ALLOWED_ENDPOINTS:
+    # Set exacto y luego un único startswith(tupla), que recorre los prefijos en C;
+    # la cabecera Upgrade solo se mira si la ruta no está permitida
+    if path in ALLOWED_ENDPOINTS or path.startswith(_ALLOWED_PATH_PREFIXES):
         return
-    if any(path.startswith(prefix) for prefix in ALLOWED_PREFIXES):
-        return
-    if path.startswith("/favicon.ico"):
+    if request.headers.get("Upgrade", "").lower() == "websocket":
         return
     logger.log(f"[HTTP] Bloqueado {path}", "WARNING")
     return jsonify({"error": "Endpoint deshabilitado"}), 404
@@ -1187,11 +1571,26 @@ def api_control():
         logger.log(f"/api/control error: {exc}", "ERROR")
         return jsonify({"error": str(exc)}), 500
 
+# ts ISO-8601 UTC del segundo actual: (segundo, texto)
+_payload_ts_cache: tuple = (0, "")
+
+
+def _payload_ts() -> str:
+    """Timestamp ISO UTC con resolución de segundo, formateado una vez por segundo."""
+    global _payload_ts_cache
+    sec = int(time.time())
+    cached_sec, text = _payload_ts_cache
+    if sec != cached_sec:
+        text = datetime.fromtimestamp(sec, tz=timezone.utc).isoformat()
+        _payload_ts_cache = (sec, text)
+    return text
+
+
 def _status_payload(force_fresh: bool = False) -> Dict[str, Any]:
     """Helper to package the current robot status for REST/SSE consumers."""
     status = get_robot_status(force_fresh=force_fresh)
-    payload = asdict(status)
-    payload["ts"] = datetime.now(timezone.utc).isoformat()
+    payload = status.to_dict()
+    payload["ts"] = _payload_ts()
     payload["robot"] = {
         "id": status.robot_id,
         "label": status.robot_label,
@@ -1208,19 +1607,70 @@ def api_status():
     """Instant snapshot for hub_service and other clients."""
     fresh_flags = {"1", "true", "yes", "on"}
     force_fresh = str(request.args.get("fresh", "")).lower() in fresh_flags
-    return jsonify(_status_payload(force_fresh=force_fresh))
+    # Sin RX nuevo desde la última respuesta al cliente: 304 sin recalcular
+    etag = _status_etag()
+    if not force_fresh and request.headers.get("If-None-Match") == etag:
+        resp = make_response("", 304)
+        resp.headers["ETag"] = etag
+        return resp
+    resp = _jsonify(_status_payload(force_fresh=force_fresh))
+    resp.headers["ETag"] = _status_etag()
+    return resp
+
+
+def _status_etag() -> str:
+    """ETag débil del estado: cambia con cada RX fresco y al menos cada
+    STREAM_HEARTBEAT_S, para que stale/serial_open lleguen aunque no haya RX."""
+    return f'W/"{_status_seq}-{int(time.time() // STREAM_HEARTBEAT_S)}"'
+
+
+# Máximo de snapshots por envío cuando el cliente pide ?batch=N
+STREAM_MAX_BATCH = 50
+# Un snapshot idéntico al anterior solo se reenvía pasado este tiempo (s)
+STREAM_HEARTBEAT_S = 2.0
+# Campos que cambian en cada snapshot aunque el robot esté quieto
+_STREAM_VOLATILE_KEYS = ("ts", "rx_age_ms")
+
+
+def _stream_batch_size() -> int:
+    """Snapshots a acumular por escritura (?batch=N); 1 = un envío por tick."""
+    try:
+        return max(1, min(STREAM_MAX_BATCH, int(request.args.get("batch", 1))))
+    except (TypeError, ValueError):
+        return 1
 
 
 @app.route("/api/status/stream")
 def api_status_stream():
     """Server-Sent Events stream mirroring the /ws/telemetry feed."""
     interval = max(0.1, TELEMETRY_INTERVAL)
+    batch_size = _stream_batch_size()
 
     def _event_stream():
+        # Con batch > 1 se juntan varios eventos SSE en una sola escritura;
+        # el cliente los sigue recibiendo como eventos independientes
+        pending: List[bytes] = []
+        seq = -1
+        last_key: Optional[Dict[str, Any]] = None
+        last_sent = 0.0
         while True:
             try:
+                # Sin RX nuevo no hay nada que recalcular hasta el heartbeat
+                seq = _wait_status_fresh(seq, STREAM_HEARTBEAT_S)
                 payload = _status_payload(force_fresh=False)
-                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                key = {k: v for k, v in payload.items() if k not in _STREAM_VOLATILE_KEYS}
+                now = time.monotonic()
+                if key == last_key and now - last_sent < STREAM_HEARTBEAT_S:
+                    time.sleep(interval)
+                    continue
+                last_key = key
+                last_sent = now
+                # id = versión del estado (crece con cada RX fresco)
+                pending.append(b"id: %d\ndata: " % seq + _dumps_bytes(payload) + b"\n\n")
+                if len(pending) >= batch_size:
+                    chunk = b"".join(pending)
+                    pending.clear()
+                    yield chunk
             except GeneratorExit:
                 break
             except Exception as exc:
@@ -1329,45 +1779,61 @@ def api_settings_save():
 # =============================================================================
 
 TELEMETRY_INTERVAL = float(os.environ.get("OPUNO_TELEMETRY_INTERVAL", "0.2"))
+# Con ?delta=1 se envía un frame completo (keyframe) cada N ticks y deltas entre medio
+TELEMETRY_KEYFRAME_EVERY = max(1, int(os.environ.get("OPUNO_TELEMETRY_KEYFRAME_EVERY", "25")))
+
+
+# sección -> clave -> (método de robot_env, conversión, log DEBUG o None).
+# Se guarda el nombre del método porque robot_env cambia al seleccionar robot.
+_CONTROL_HANDLERS: Dict[str, Dict[str, tuple]] = {
+    "setpoints": {
+        "x_mm": ("set_corredera_mm", float, None),
+        "a_deg": ("set_angulo_deg", float, None),
+        "volumen_ml": ("set_volumen_objetivo_ml", float, "[FLOW] set objetivo volumen_ml=%s"),
+        "z_mm": ("set_z_mm", float, None),
+        "servo_z_deg": ("set_servo_z_deg", float, None),
+    },
+    "energies": {
+        "x": ("set_energia_corredera", int, None),
+        "a": ("set_energia_angulo", int, None),
+        "bomba": ("set_energia_bomba", int, "[FLOW] energia bomba=%s"),
+    },
+    "motion": {
+        "z_speed_deg_s": ("set_servo_z_speed", float, None),
+    },
+    "calibration": {
+        "steps_mm": ("set_pasos_por_mm", float, None),
+        "steps_deg": ("set_pasos_por_grado", float, None),
+    },
+}
 
 
 def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
     """Aplica un payload de control directo sobre el robot."""
+    global FLOW_CMAX_MLS
     if not _is_serial_connected():
         raise RuntimeError("Serial desconectado. No se pueden enviar comandos.")
     logger.log(f"[control] payload: {data}")
     # PROMPT(ws/control): definir handshake, payloads y reintentos
+    # Logs y registro TX se difieren hasta soltar env_lock (solo setters + step adentro)
+    deferred: List[tuple] = []
+    # Nivel DEBUG leído una vez: sin él no se arman las tuplas de log del camino
+    debug = logger.debug_enabled
     with env_lock:
-        if "setpoints" in data:
-            sp = data["setpoints"] or {}
-            if "x_mm" in sp:
-                robot_env.set_corredera_mm(float(sp["x_mm"]))
-            if "a_deg" in sp:
-                robot_env.set_angulo_deg(float(sp["a_deg"]))
-            if "volumen_ml" in sp:
-                v = float(sp["volumen_ml"])
-                robot_env.set_volumen_objetivo_ml(v)
-                logger.log(f"[FLOW] set objetivo volumen_ml={v}", "DEBUG")
-            if "z_mm" in sp:
-                robot_env.set_z_mm(float(sp["z_mm"]))
-            if "servo_z_deg" in sp:
-                robot_env.set_servo_z_deg(float(sp["servo_z_deg"]))
-
-        if "energies" in data:
-            en = data["energies"] or {}
-            if "x" in en:
-                robot_env.set_energia_corredera(int(en["x"]))
-            if "a" in en:
-                robot_env.set_energia_angulo(int(en["a"]))
-            if "bomba" in en:
-                eb = int(en["bomba"])
-                robot_env.set_energia_bomba(eb)
-                logger.log(f"[FLOW] energia bomba={eb}", "DEBUG")
-
-        if "motion" in data:
-            mv = data["motion"] or {}
-            if "z_speed_deg_s" in mv:
-                robot_env.set_servo_z_speed(float(mv["z_speed_deg_s"]))
+        # Secciones simples: recorrer solo las claves presentes en el payload
+        for section, handlers in _CONTROL_HANDLERS.items():
+            values = data.get(section)
+            if not isinstance(values, dict):
+                continue
+            for key, raw in values.items():
+                h = handlers.get(key)
+                if h is None:
+                    continue
+                setter, cast, debug_msg = h
+                v = cast(raw)
+                getattr(robot_env, setter)(v)
+                if debug and debug_msg:
+                    deferred.append((debug_msg, "DEBUG", v))
 
         if "pid_settings" in data:
             pid_settings = data["pid_settings"] or {}
@@ -1378,41 +1844,37 @@ def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
             if pid_a and all(k in pid_a for k in ("kp", "ki", "kd")):
                 robot_env.set_pid_angulo(float(pid_a["kp"]), float(pid_a["ki"]), float(pid_a["kd"]))
 
-        if "calibration" in data:
-            calib = data["calibration"] or {}
-            if "steps_mm" in calib:
-                robot_env.set_pasos_por_mm(float(calib["steps_mm"]))
-            if "steps_deg" in calib:
-                robot_env.set_pasos_por_grado(float(calib["steps_deg"]))
-
         if "flow" in data:
             fl = data["flow"] or {}
             if "usar_sensor_flujo" in fl:
                 val = fl["usar_sensor_flujo"]
                 u = bool(int(val)) if isinstance(val, (int, str)) else bool(val)
                 robot_env.set_usar_sensor_flujo(u)
-                logger.log(f"[FLOW] usar_sensor_flujo={int(u)}", "DEBUG")
+                if debug:
+                    deferred.append(("[FLOW] usar_sensor_flujo=%d", "DEBUG", u))
             # cmax (calibración)
             if "caudal_bomba_mls" in fl:
                 try:
                     c = float(fl["caudal_bomba_mls"])
-                    globals()["FLOW_CMAX_MLS"] = max(0.0, c)
-                    robot_env.set_caudal_bomba_ml_s(globals()["FLOW_CMAX_MLS"])  # act[19]
-                    logger.log(f"[FLOW] cmax (caudal_bomba_mls)={globals()['FLOW_CMAX_MLS']}", "DEBUG")
+                    FLOW_CMAX_MLS = max(0.0, c)
+                    robot_env.set_caudal_bomba_ml_s(FLOW_CMAX_MLS)  # act[19]
+                    if debug:
+                        deferred.append(("[FLOW] cmax (caudal_bomba_mls)=%s", "DEBUG", FLOW_CMAX_MLS))
                 except Exception as exc:
-                    logger.log(f"[FLOW] cmax inválido: {exc}", "WARNING")
+                    deferred.append((f"[FLOW] cmax inválido: {exc}", "WARNING"))
             if "deadband_energy" in fl:
                 try:
                     db = int(float(fl["deadband_energy"]))
-                    globals()["FLOW_DEADBAND_ENERGY"] = max(0, min(255, db))
+                    _set_flow_deadband(db)
                     if hasattr(robot_env, 'set_deadband_energy'):
                         try:
-                            robot_env.set_deadband_energy(globals()["FLOW_DEADBAND_ENERGY"])  # type: ignore[attr-defined]
+                            robot_env.set_deadband_energy(FLOW_DEADBAND_ENERGY)  # type: ignore[attr-defined]
                         except Exception:
                             pass
-                    logger.log(f"[FLOW] deadband_energy={globals()['FLOW_DEADBAND_ENERGY']}", "DEBUG")
+                    if debug:
+                        deferred.append(("[FLOW] deadband_energy=%s", "DEBUG", FLOW_DEADBAND_ENERGY))
                 except Exception as exc:
-                    logger.log(f"[FLOW] deadband_energy inválido: {exc}", "WARNING")
+                    deferred.append((f"[FLOW] deadband_energy inválido: {exc}", "WARNING"))
 
         if "modo" in data:
             modo = int(data["modo"])
@@ -1440,16 +1902,18 @@ def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
             en = data.get("energies") or {}
             set_has_bomba = ("bomba" in en)
             if isinstance(fl, dict):
+                # Vector TX actual, leído una sola vez para cmax y usar_sensor
+                act = getattr(robot_env, 'act', None)
+                act_len = len(act) if act is not None else 0
                 # Config actual (cmax)
                 cmax = None
                 try:
-                    act = getattr(robot_env, 'act', None)
-                    if act is not None and len(act) > 19:
+                    if act_len > 19:
                         cmax = float(act[19])
                 except Exception:
                     cmax = None
                 if not cmax or cmax <= 0:
-                    cmax = float(globals().get("FLOW_CMAX_MLS", 50.0) or 50.0)
+                    cmax = float(FLOW_CMAX_MLS or 50.0)
                 # ¿Sin sensor? entonces mapear flujo objetivo → energía
                 usar_sens = None
                 try:
@@ -1458,8 +1922,7 @@ def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
                     usar_sens = None
                 if usar_sens is None:
                     try:
-                        act = getattr(robot_env, 'act', None)
-                        if act is not None and len(act) > 18:
+                        if act_len > 18:
                             usar_sens = bool(int(act[18]))
                     except Exception:
                         usar_sens = False
@@ -1474,7 +1937,7 @@ def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
                     f_tgt = 0.0
                 if not usar_sens:
                     try:
-                        db = globals()["FLOW_DEADBAND_ENERGY"]
+                        db = FLOW_DEADBAND_ENERGY
                         if f_tgt <= 0 or cmax <= 0:
                             e = 0
                         else:
@@ -1482,24 +1945,32 @@ def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
                             e = int(round(db + alpha * (255 - db)))
                         if not set_has_bomba:
                             robot_env.set_energia_bomba(e)
-                        logger.log(f"[FLOW] map f={f_tgt} ml/s @cmax={cmax} db={db} → energia={e}", "DEBUG")
+                        if debug:
+                            deferred.append(("[FLOW] map f=%s ml/s @cmax=%s db=%s → energia=%s", "DEBUG", f_tgt, cmax, db, e))
                     except Exception as exc:
-                        logger.log(f"[FLOW] mapeo flujo→energía falló: {exc}", "WARNING")
+                        deferred.append((f"[FLOW] mapeo flujo→energía falló: {exc}", "WARNING"))
         except Exception:
             pass
 
         # Paso de control → envía TX al firmware / virtual
         robot_env.step()
-        try:
-            act = getattr(robot_env, 'act', None)
-            if act is not None and len(act) >= 7:
-                logger.log(f"[TX] modo={int(act[0])} eA={int(act[1])} eX={int(act[2])} eB={int(act[3])} volObj={float(act[6]):.2f} caudal={float(act[19]) if len(act)>19 else 0.0}", "DEBUG")
-        except Exception:
-            pass
-        try:
-            _set_last_tx(json.dumps(data, ensure_ascii=False))
-        except Exception:
-            _set_last_tx(str(data))
+        act_tx = None
+        if debug:
+            try:
+                act_tx = robot_env.act.tolist()
+            except Exception:
+                act_tx = None
+
+    for entry in deferred:
+        logger.log(*entry)
+    if act_tx is not None and len(act_tx) >= 7:
+        logger.log("[TX] modo=%d eA=%d eX=%d eB=%d volObj=%.2f caudal=%s", "DEBUG",
+                   act_tx[0], act_tx[1], act_tx[2], act_tx[3], act_tx[6],
+                   float(act_tx[19]) if len(act_tx) > 19 else 0.0)
+    try:
+        _set_last_tx(_dumps(data))
+    except Exception:
+        _set_last_tx(str(data))
 
     commands_applied: Dict[str, Any] = {}
     for key in ("setpoints", "energies", "motion", "pid_settings", "calibration", "flow", "modo"):
@@ -1520,19 +1991,44 @@ def apply_control_payload(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+# Máximo de mensajes pendientes de /ws/control que se fusionan en un solo payload
+CONTROL_COALESCE_MAX = max(1, int(os.environ.get("OPUNO_CONTROL_COALESCE_MAX", "32")))
+
+
+def _merge_control_bodies(bodies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fusiona payloads de control consecutivos: secciones dict por clave, el último gana."""
+    merged: Dict[str, Any] = {}
+    for body in bodies:
+        for key, value in body.items():
+            cur = merged.get(key)
+            if isinstance(value, dict) and isinstance(cur, dict):
+                merged[key] = {**cur, **value}
+            else:
+                merged[key] = value
+    return merged
+
+
+# Prefijo JSON del hello de /ws/control por robot_id (solo cambia el ts)
+_control_hello_heads: Dict[Optional[str], str] = {}
+
+
+def _control_hello(ts: str) -> str:
+    rid = active_robot_id
+    head = _control_hello_heads.get(rid)
+    if head is None:
+        kind = _profile_for(rid or "real")[1]
+        head = '{"type":"control_ready","robot_id":' + _dumps(rid) + ',"kind":' + _dumps(kind) + ',"ts":"'
+        _control_hello_heads[rid] = head
+    return head + ts + '"}'
+
+
 @sock.route("/ws/control")
 def ws_control(ws):
     """Canal principal para control manual del robot."""
     session_id = f"ctrl-{int(time.time()*1000)}"
     logger.log(f"[ws/control] sesión abierta ({session_id})")
-    hello = {
-        "type": "control_ready",
-        "robot_id": active_robot_id,
-        "kind": ROBOT_PROFILES.get(active_robot_id or "real", {}).get("kind", "hardware"),
-        "ts": datetime.now(timezone.utc).isoformat(),
-    }
     try:
-        ws.send(json.dumps(hello, ensure_ascii=False))
+        ws.send(_control_hello(datetime.now(timezone.utc).isoformat()))
     except Exception:
         pass
     try:
@@ -1540,37 +2036,54 @@ def ws_control(ws):
             raw = ws.receive()
             if raw is None:
                 continue
-            try:
-                payload = json.loads(raw)
-            except Exception as exc:
-                ws.send(json.dumps({"type": "control_ack", "status": "error", "error": f"invalid_json: {exc}"}))
-                continue
-            if isinstance(payload, dict) and payload.get("type") == "ping":
-                ws.send(json.dumps({"type": "pong", "ts": datetime.now(timezone.utc).isoformat()}))
-                continue
-            body = payload.get("body") if isinstance(payload, dict) and "body" in payload else payload
-            if not isinstance(body, dict):
-                ws.send(json.dumps({"type": "control_ack", "status": "error", "error": "body_required"}))
+            # Tomar sin bloquear lo que ya llegó detrás: ráfagas (joystick) se
+            # aplican como un solo payload y un solo TX
+            raws = [raw]
+            while len(raws) < CONTROL_COALESCE_MAX:
+                nxt = ws.receive(timeout=0)
+                if nxt is None:
+                    break
+                raws.append(nxt)
+            # Un solo timestamp por iteración para pong y ack
+            ts = datetime.now(timezone.utc).isoformat()
+            bodies: List[Dict[str, Any]] = []
+            for raw in raws:
+                try:
+                    payload = _loads(raw)
+                except Exception as exc:
+                    ws.send(_dumps({"type": "control_ack", "status": "error", "error": f"invalid_json: {exc}"}))
+                    continue
+                if isinstance(payload, dict) and payload.get("type") == "ping":
+                    ws.send(_dumps({"type": "pong", "ts": ts}))
+                    continue
+                body = payload.get("body") if isinstance(payload, dict) and "body" in payload else payload
+                if not isinstance(body, dict):
+                    ws.send(_dumps({"type": "control_ack", "status": "error", "error": "body_required"}))
+                    continue
+                bodies.append(body)
+            if not bodies:
                 continue
             try:
-                result = apply_control_payload(body)
+                result = apply_control_payload(bodies[0] if len(bodies) == 1 else _merge_control_bodies(bodies))
                 snapshot = _status_payload(force_fresh=False)
-                ws.send(json.dumps({
+                ws.send(_dumps({
                     "type": "control_ack",
                     "status": "ok",
-                    "ts": datetime.now(timezone.utc).isoformat(),
+                    "ts": ts,
                     "body": result,
+                    "coalesced": len(bodies),
                     "status_snapshot": snapshot,
-                }, ensure_ascii=False))
+                }))
             except Exception as exc:
                 logger.log(f"[ws/control] error: {exc}", "ERROR")
-                ws.send(json.dumps({"type": "control_ack", "status": "error", "error": str(exc)}))
+                ws.send(_dumps({"type": "control_ack", "status": "error", "error": str(exc),
+                                "coalesced": len(bodies)}))
     except ConnectionClosed:
         logger.log(f"[ws/control] sesión cerrada ({session_id})", "INFO")
     except Exception as exc:
         logger.log(f"[ws/control] fallo crítico ({session_id}): {exc}", "ERROR")
         try:
-            ws.send(json.dumps({"type": "control_ack", "status": "error", "error": str(exc)}))
+            ws.send(_dumps({"type": "control_ack", "status": "error", "error": str(exc)}))
         except Exception:
             pass
     finally:
@@ -1580,38 +2093,146 @@ def ws_control(ws):
             pass
 
 
+# Telemetría compartida: un solo productor arma y codifica el frame por tick y
+# todos los sockets /ws/telemetry envían el mismo texto. "delta" es el frame
+# telemetry_delta respecto del tick anterior (None en los keyframes)
+_tele_cond = threading.Condition()
+_tele_cache: Dict[str, Any] = {"seq": 0, "frame": "", "delta": None, "payload": None}
+_tele_clients = 0
+_tele_thread: Optional[threading.Thread] = None
+
+
+_DELTA_MISSING = object()
+# Prefijos constantes de los frames de telemetría (ts es ISO, sin escapes)
+_TELE_FRAME_HEAD = '{"type":"telemetry","ts":"'
+_TELE_DELTA_HEAD = '{"type":"telemetry_delta","ts":"'
+
+
+def _status_delta(prev: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    """Claves de cur que cambiaron respecto de prev; en dicts anidados solo las hojas."""
+    out: Dict[str, Any] = {}
+    for k, v in cur.items():
+        pv = prev.get(k, _DELTA_MISSING)
+        if pv == v:
+            continue
+        if isinstance(v, dict) and isinstance(pv, dict):
+            out[k] = _status_delta(pv, v)
+        else:
+            out[k] = v
+    return out
+
+
+def _tele_producer():
+    """Genera un frame de telemetría por intervalo mientras haya suscriptores."""
+    global _tele_thread
+    interval = max(0.05, TELEMETRY_INTERVAL)
+    prev_status: Optional[Dict[str, Any]] = None
+    tick = 0
+    while True:
+        with _tele_cond:
+            if _tele_clients <= 0:
+                _tele_thread = None
+                return
+        try:
+            ts = datetime.now(timezone.utc).isoformat()
+            robot_id = active_robot_id
+            status = _status_payload(force_fresh=False)
+            payload = {"type": "telemetry", "ts": ts, "robot_id": robot_id, "status": status}
+            # Sobre armado a mano: solo se codifican robot_id y status
+            rid_json = _dumps(robot_id)
+            frame = _TELE_FRAME_HEAD + ts + '","robot_id":' + rid_json + ',"status":' + _dumps(status) + "}"
+            delta = None
+            if prev_status is not None and tick % TELEMETRY_KEYFRAME_EVERY:
+                delta = (_TELE_DELTA_HEAD + ts + '","robot_id":' + rid_json
+                         + ',"changes":' + _dumps(_status_delta(prev_status, status)) + "}")
+            prev_status = status
+            tick += 1
+        except Exception as exc:
+            logger.log(f"[ws/telemetry] error en productor: {exc}", "ERROR")
+        else:
+            with _tele_cond:
+                _tele_cache["seq"] += 1
+                _tele_cache["frame"] = frame
+                _tele_cache["delta"] = delta
+                _tele_cache["payload"] = payload
+                _tele_cond.notify_all()
+        time.sleep(interval)
+
+
+def _tele_subscribe():
+    """Registra un socket de telemetría y arranca el productor si no corre."""
+    global _tele_clients, _tele_thread
+    with _tele_cond:
+        _tele_clients += 1
+        if _tele_thread is None:
+            _tele_thread = threading.Thread(target=_tele_producer, name="tele-producer", daemon=True)
+            _tele_thread.start()
+
+
+def _tele_unsubscribe():
+    global _tele_clients
+    with _tele_cond:
+        _tele_clients = max(0, _tele_clients - 1)
+
+
+def _tele_wait(last_seq: int, timeout: float):
+    """Espera un frame posterior a last_seq (o timeout); devuelve (seq, frame, delta, payload)."""
+    with _tele_cond:
+        _tele_cond.wait_for(lambda: _tele_cache["seq"] != last_seq, timeout)
+        c = _tele_cache
+        return c["seq"], c["frame"], c["delta"], c["payload"]
+
+
 @sock.route("/ws/telemetry")
 def ws_telemetry(ws):
     """Canal SSE->WS para telemetría periódica."""
     # PROMPT(ws/telemetry): campos mínimos (ts, axes, energies, tasks)
     session_id = f"tele-{int(time.time()*1000)}"
     logger.log(f"[ws/telemetry] sesión abierta ({session_id})")
+    # ?batch=N: un frame {"type": "telemetry_batch", "batch": [...]} cada N ticks
+    batch_size = _stream_batch_size()
+    # ?delta=1 (sin batch): "telemetry" completo como keyframe y luego
+    # {"type": "telemetry_delta", "changes": {...}} con solo lo que cambió; el
+    # cliente fusiona changes sobre el último status (dicts anidados por clave)
+    use_delta = batch_size == 1 and request.args.get("delta", "0") in ("1", "true")
+    pending: List[Dict[str, Any]] = []
+    wait_s = max(1.0, 5 * TELEMETRY_INTERVAL)
+    _tele_subscribe()
     try:
-        ws.send(json.dumps({
+        ws.send(_dumps({
             "type": "telemetry_ready",
             "robot_id": active_robot_id,
             "interval_s": TELEMETRY_INTERVAL,
+            "batch": batch_size,
+            "delta": use_delta,
+            "keyframe_every": TELEMETRY_KEYFRAME_EVERY if use_delta else None,
             "ts": datetime.now(timezone.utc).isoformat(),
-        }, ensure_ascii=False))
+        }))
+        seq = 0
         while True:
-            status_payload = _status_payload(force_fresh=False)
-            payload = {
-                "type": "telemetry",
-                "ts": datetime.now(timezone.utc).isoformat(),
-                "robot_id": active_robot_id,
-                "status": status_payload,
-            }
-            ws.send(json.dumps(payload, ensure_ascii=False))
-            time.sleep(max(0.05, TELEMETRY_INTERVAL))
+            new_seq, frame, delta, payload = _tele_wait(seq, wait_s)
+            if new_seq == seq:
+                continue
+            # El delta solo vale si este socket recibió el tick inmediato anterior
+            contiguous = seq != 0 and new_seq == seq + 1
+            seq = new_seq
+            if batch_size == 1:
+                ws.send(delta if (use_delta and contiguous and delta is not None) else frame)
+            else:
+                pending.append(payload)
+                if len(pending) >= batch_size:
+                    ws.send(_dumps({"type": "telemetry_batch", "batch": pending}))
+                    pending = []
     except ConnectionClosed:
         logger.log(f"[ws/telemetry] sesión cerrada ({session_id})", "INFO")
     except Exception as exc:
         logger.log(f"[ws/telemetry] error ({session_id}): {exc}", "ERROR")
         try:
-            ws.send(json.dumps({"type": "telemetry_error", "error": str(exc)}))
+            ws.send(_dumps({"type": "telemetry_error", "error": str(exc)}))
         except Exception:
             pass
     finally:
+        _tele_unsubscribe()
         try:
             ws.close()
         except Exception:
@@ -1675,11 +2296,11 @@ def api_execute_task_v2():
         # Bloqueo si serial desconectado
         if not _is_serial_connected():
             logger.log("/api/tasks/execute rechazado: serial desconectado", "WARN")
-            return jsonify({
+            return _jsonify({
                 "error": "Serial desconectado. Conéctelo en Settings antes de ejecutar.",
                 "robot_connection": "disconnected",
                 "message": "Controles deshabilitados hasta conectar el serial"
-            }), 409
+            }, 409)
         data = get_request_data()
         logger.log(f"/api/tasks/execute recibido: {data}")
         
@@ -1687,11 +2308,11 @@ def api_execute_task_v2():
         name = data.get("name", "Tarea sin nombre")
         protocol_name = data.get("protocol_name")
         if not protocol_name:
-            return jsonify({"error": "Se requiere 'protocol_name'"}), 400
+            return _jsonify({"error": "Se requiere 'protocol_name'"}, 400)
         # Validar existencia del protocolo
         if not Protocolo.existe(protocol_name, str(PROTOCOLS_DIR)):
             logger.log(f"Protocolo no encontrado: {protocol_name}", "WARN")
-            return jsonify({"error": f"Protocolo '{protocol_name}' no encontrado"}), 404
+            return _jsonify({"error": f"Protocolo '{protocol_name}' no encontrado"}, 404)
         
         # Parámetros opcionales
         duration_seconds = float(data.get("duration_seconds", 10.0))
@@ -1780,10 +2401,10 @@ def api_execute_task_v2():
                 runner_active = False
             if runner_active:
                 logger.log("Ejecución rechazada: runner activo", "WARN")
-                return jsonify({
+                return _jsonify({
                     "error": "Ya hay una ejecución en curso. Detén la actual antes de iniciar otra.",
                     "active": [ {"task_id": getattr(t,'task_id',None), "status": getattr(getattr(t,'status',None),'value',None), "started_at": getattr(t,'started_at',None)} for t in (active or []) ]
-                }), 409
+                }, 409)
             # Si el runner NO está activo, permitimos lanzar aunque el ejecutor reporte items antiguos
         except Exception:
             pass
@@ -1817,7 +2438,7 @@ def api_execute_task_v2():
             except Exception:
                 sensors = {}
             logger.log(f"/api/tasks/execute sync FIN: {result.status.value} dur={result.duration}s")
-            return jsonify({
+            return _jsonify({
                 "status": "completed",
                 "task_id": result.task_id,
                 "execution_status": result.status.value,
@@ -1836,12 +2457,12 @@ def api_execute_task_v2():
             # Snapshot de sensores actuales para clientes lentos
             try:
                 rs = get_robot_status()
-                snap = asdict(rs)
+                snap = rs.to_dict()
             except Exception:
                 snap = {}
             sensors = _filter_sensors(snap, sensor_config_req or {})
 
-            return jsonify({
+            return _jsonify({
                 "status": "executing",
                 "execution_id": execution_id,
                 "task_id": task_def.id,
@@ -1854,7 +2475,7 @@ def api_execute_task_v2():
         
     except Exception as e:
         logger.log(f"Error ejecutando tarea v2: {e}", "ERROR")
-        return jsonify({"error": str(e)}), 400
+        return _jsonify({"error": str(e)}, 400)
 
 # =============================================================================
 # COMPATIBILIDAD: /api/execute y tracking de ejecuciones
@@ -1946,8 +2567,7 @@ def api_execution_stop(execution_id: str):
 def api_serial_ports():
     """API para listar puertos serial"""
     # Determinar si es virtual basado en el perfil activo y el entorno
-    profile = ROBOT_PROFILES.get(active_robot_id or "real", {})
-    profile_is_virtual = profile.get("is_virtual", False)
+    profile_is_virtual = _profile_for(active_robot_id or "real")[2]
     env_is_virtual = bool(getattr(robot_env, "is_virtual", False))
     
     # Es virtual si el perfil lo dice (prioridad) o el entorno lo reporta
@@ -2064,12 +2684,7 @@ def api_stop():
             return jsonify({"error": "Serial desconectado"}), 409
         with env_lock:
             # Establecer energías a 0 y modo stop (códigoModo = 3)
-            robot_env.set_energia_corredera(0)
-            robot_env.set_energia_angulo(0)
-            robot_env.set_energia_bomba(0)
-            robot_env.set_volumen_objetivo_ml(0)
-            robot_env.set_modo(cod=3)
-            robot_env.step()
+            robot_env.set_stop_state()
 
         return jsonify({"status": "stopped"})
     except Exception as e:
@@ -2121,12 +2736,15 @@ def api_emergency_stop():
 
 def status_update_loop():
     """Hilo para actualización de estado del robot"""
+    global _status_loop_running
     logger.log("Hilo de actualización de estado iniciado")
+    _status_loop_running = True
     error_count = 0
     while True:
         try:
-            # Obtener estado (lee RX)
-            get_robot_status()
+            # Obtener estado (lee RX) y publicarlo para el resto de los lectores
+            with _status_build_lock:
+                _build_robot_status()
             # Enviar keepalive de TX con el vector actual para asegurar recepción continua en el firmware
             try:
                 with env_lock:
@@ -2187,6 +2805,8 @@ def initialize_system():
     
     logger.log("Sistema iniciado correctamente")
     _start_visualizer()
+    if PB_GUI_PREWARM:
+        _pb_gui_prewarm()
 
 
 def _start_visualizer() -> bool:
@@ -4,6 +4,7 @@
         let refs = null;
         let pollTimer = null;
         let lastFrameUrl = null;
+        let lastFrameEtag = null;
         let cameraState = {
             target: [0, 0, 0.03],
             distance: 0.35,
@@ -337,8 +338,15 @@
 
             const fetchFrame = async () => {
                 try {
-                    // Usar timestamp para evitar caché
-                    const response = await fetch(`/api/pybullet/frame?ts=${Date.now()}`, { cache: 'no-store' });
+                    // Usar timestamp para evitar caché; con If-None-Match el server
+                    // responde 304 si la escena no cambió
+                    const headers = lastFrameEtag ? { 'If-None-Match': lastFrameEtag } : {};
+                    const response = await fetch(`/api/pybullet/frame?ts=${Date.now()}`, { cache: 'no-store', headers });
+
+                    if (response.status === 304) {
+                        setStatus('Visualización en vivo', true);
+                        return;
+                    }
 
                     if (response.status === 503 || response.status === 404) {
                         setStatus('PyBullet no disponible', false);
@@ -351,6 +359,7 @@
                     }
 
                     const blob = await response.blob();
+                    lastFrameEtag = response.headers.get('ETag');
                     if (lastFrameUrl) {
                         URL.revokeObjectURL(lastFrameUrl);
                     }
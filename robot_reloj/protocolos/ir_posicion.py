@@ -8,10 +8,12 @@ Protocolo que mueve el robot hacia una posición X/A específica.
 """
 
 import numpy as np
-import math
 from typing import Dict, Any
 from protocolos import ProtocoloBase
 
+# Observación normalizada cuando el entorno no entrega un dict (solo lectura)
+_NO_DATA = {}
+
 class IrPosicion(ProtocoloBase):
     """
     Protocolo para mover el robot a una posición específica.
@@ -19,6 +21,10 @@ class IrPosicion(ProtocoloBase):
     Mueve los ejes X y A hasta alcanzar las coordenadas objetivo.
     """
     
+    # Distancia máxima posible (normaliza el reward) y su cuadrado
+    _MAX_D = 300.0
+    _MAX_D2 = _MAX_D * _MAX_D
+    
     # Schema de parámetros para UI dinámica
     PARAMETERS = {
         "x_mm": {
@@ -58,6 +64,15 @@ class IrPosicion(ProtocoloBase):
         self.target_x = float(kwargs.get('x_mm', 150.0))
         self.target_a = float(kwargs.get('a_deg', 0.0))
         self.threshold = float(kwargs.get('threshold', 2.0))
+        # Sin verbose, step no formatea el texto de log
+        self._verbose = bool(kwargs.get('verbose', True))
+        
+        # Patch constante durante el episodio: se reutiliza en cada paso
+        self._patch_tmpl = {
+            "setpointX_mm": self.target_x,
+            "setpointA_deg": self.target_a,
+            "codigoModo": 0  # PID mode
+        }
         
         # Estado interno
         self.current_x = 0.0
@@ -92,38 +107,43 @@ class IrPosicion(ProtocoloBase):
         3. Si alcanzó objetivo, marcar done=True
         """
         super().step(action)
+        tx, ta, thr = self.target_x, self.target_a, self.threshold
         
         # 1. Obtener observación
         obs = self._get_observation()
-        self.current_x = float(obs.get('x_mm', 0.0)) if isinstance(obs, dict) else 0.0
-        self.current_a = float(obs.get('a_deg', 0.0)) if isinstance(obs, dict) else 0.0
+        data = obs if isinstance(obs, dict) else _NO_DATA
+        cx = self.current_x = float(data.get('x_mm', 0.0))
+        ca = self.current_a = float(data.get('a_deg', 0.0))
         
         # 2. Calcular distancias
-        dx = abs(self.current_x - self.target_x)
-        da = abs(self.current_a - self.target_a)
+        dx = abs(cx - tx)
+        # Distancia angular por el camino corto (cruce 0/360)
+        da = abs(ca - ta) % 360.0
+        da = min(da, 360.0 - da)
         
         # 3. Comandos de movimiento (setpoints)
-        patch = {
-            "setpointX_mm": self.target_x,
-            "setpointA_deg": self.target_a,
-            "codigoModo": 0  # PID mode
-        }
+        patch = self._patch_tmpl
         
-        # 4. Calcular reward (proximidad al objetivo)
-        max_distance = 300  # Distancia máxima posible
-        distance = math.sqrt(dx**2 + da**2)
-        reward = 100.0 * (1.0 - min(distance / max_distance, 1.0))
+        # 4. Calcular reward (proximidad al objetivo), comparando distancias al cuadrado
+        d2 = dx * dx + da * da
+        max_d2 = self._MAX_D2
+        if d2 >= max_d2:
+            reward = 0.0
+        else:
+            reward = 100.0 * (1.0 - (d2 / max_d2) ** 0.5)
         
         # 5. Verificar done (objetivo alcanzado)
-        x_reached = dx <= self.threshold
-        a_reached = da <= self.threshold
+        x_reached = dx <= thr
+        a_reached = da <= thr
         done = x_reached and a_reached
         
         # 6. Info y log
-        if done:
-            log = f"✅ Posición alcanzada: X={self.current_x:.1f}mm, A={self.current_a:.1f}°"
+        if not self._verbose:
+            log = ''
+        elif done:
+            log = f"✅ Posición alcanzada: X={cx:.1f}mm, A={ca:.1f}°"
         else:
-            log = f"→ Moviendo: X={self.current_x:.1f}/{self.target_x:.1f}mm (Δ{dx:.1f}), A={self.current_a:.1f}/{self.target_a:.1f}° (Δ{da:.1f})"
+            log = f"→ Moviendo: X={cx:.1f}/{tx:.1f}mm (Δ{dx:.1f}), A={ca:.1f}/{ta:.1f}° (Δ{da:.1f})"
         
         info = {
             "patch": patch,
@@ -12,6 +12,9 @@ import math
 from typing import Dict, Any
 from protocolos import ProtocoloBase
 
+# Observación normalizada cuando el entorno no entrega un dict (solo lectura)
+_NO_DATA = {}
+
 class Regar(ProtocoloBase):
     """
     Protocolo de riego SIMPLE: solo bombea volumen con caudal específico.
@@ -47,6 +50,15 @@ class Regar(ProtocoloBase):
         super().__init__(**kwargs)
         self.target_volume = float(kwargs.get('volume_ml', 100.0))
         self.target_flow = float(kwargs.get('flow_ml_s', 5.0))
+        # Sin verbose, step no formatea el texto de log
+        self._verbose = bool(kwargs.get('verbose', True))
+        
+        # Patch constante durante el episodio: se reutiliza en cada paso
+        self._patch_tmpl = {
+            "volumenObjetivoML": self.target_volume,
+            "caudalObjetivoMLS": self.target_flow,
+            "codigoModo": 0  # Modo automático
+        }
     
     def reset(self):
         """Estado inicial"""
@@ -85,31 +97,31 @@ class Regar(ProtocoloBase):
         3. Si alcanzó objetivo, marcar done=True
         """
         super().step(action)
+        tv, tf = self.target_volume, self.target_flow
         
         # 1. Obtener observación
         obs = self._get_observation()
-        pumped_vol = float(obs.get('volumen_ml', 0.0)) if isinstance(obs, dict) else 0.0
+        data = obs if isinstance(obs, dict) else _NO_DATA
+        pumped_vol = float(data.get('volumen_ml', 0.0))
         
         # 2. Comandos de bombeo
-        patch = {
-            "volumenObjetivoML": self.target_volume,
-            "caudalObjetivoMLS": self.target_flow,
-            "codigoModo": 0  # Modo automático
-        }
+        patch = self._patch_tmpl
         
         # 3. Calcular progreso y reward
-        progress = min(pumped_vol / max(self.target_volume, 1.0), 1.0)
+        progress = min(pumped_vol / max(tv, 1.0), 1.0)
         reward = 100.0 * progress
         
         # 4. Verificar done (objetivo alcanzado)
-        remaining = self.target_volume - pumped_vol
+        remaining = tv - pumped_vol
         done = remaining <= 1.0  # Tolerancia de 1ml
         
         # 5. Info y log
-        if done:
+        if not self._verbose:
+            log = ''
+        elif done:
             log = f"✅ Riego completo: {pumped_vol:.1f}ml bombeados"
         else:
-            log = f"💧 Bombeando: {pumped_vol:.1f}/{self.target_volume}ml ({progress*100:.1f}%) @ {self.target_flow}ml/s"
+            log = f"💧 Bombeando: {pumped_vol:.1f}/{tv}ml ({progress*100:.1f}%) @ {tf}ml/s"
         
         info = {
             "patch": patch,
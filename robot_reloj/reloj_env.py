@@ -10,6 +10,7 @@
 # ------------------------------------------------------------
 from __future__ import annotations
 import os,csv,json,time,uuid,queue,threading as th
+from collections import deque
 from datetime import datetime,timedelta
 from typing import Optional,Dict,Any
 import numpy as np
@@ -28,6 +29,37 @@ _now=lambda:datetime.now()
 _fmt=lambda dt:dt.strftime('%Y-%m-%d %H:%M:%S')
 _parse=lambda s:datetime.strptime(s,'%Y-%m-%d %H:%M:%S')
 
+# --------- anillo RX ---------
+class RxRing:
+    """Cola RX acotada sobre deque(maxlen): put/get_nowait sin lock (append/popleft
+    son atómicos), al llenarse descarta el más viejo. Misma API que queue.Queue
+    para put_nowait/get_nowait/get(timeout); el Event solo despierta esperas."""
+    def __init__(self,maxsize:int=5):
+        self._buf=deque(maxlen=maxsize); self._ev=th.Event()
+    def put_nowait(self,item):
+        self._buf.append(item); self._ev.set()
+    def get_nowait(self):
+        try: return self._buf.popleft()
+        except IndexError: raise queue.Empty from None
+    def get(self,timeout:Optional[float]=None):
+        end=None if timeout is None else time.monotonic()+timeout
+        while True:
+            try: return self._buf.popleft()
+            except IndexError: pass
+            self._ev.clear()
+            if self._buf: continue  # llegó algo entre popleft y clear
+            left=None if end is None else end-time.monotonic()
+            if left is not None and left<=0: raise queue.Empty
+            self._ev.wait(left)
+    def get_latest(self):
+        """Vacía el anillo y devuelve la observación más nueva (o None)."""
+        latest=None
+        while True:
+            try: latest=self._buf.popleft()
+            except IndexError: return latest
+    def qsize(self)->int: return len(self._buf)
+    def empty(self)->bool: return not self._buf
+
 class RelojEnv(gym.Env):
     """Entorno SOLO SERIAL. TX(20): [0..19], RX(21): [0..20]."""
     metadata={"render.modes":["human"]}
@@ -91,7 +123,7 @@ class RelojEnv(gym.Env):
         self.rx_names=['posX_mm','angulo_deg','valorBombaAplicado','volumenML','limiteX','limiteA','calibrandoX','calibrandoA','cmdX_aplicado','cmdA_aplicado','cmdBomba_aplicado','codigoModo','kpX','kiX','kdX','kpA','kiA','kdA','pasosPorMM','pasosPorGrado','factorCalibracionFlujo','z_mm']
         # serial & rx
         self.ser=None; self._ser_try=0.0; self._ser_err=False
-        self.q: "queue.Queue[np.ndarray]"=queue.Queue(maxsize=5)
+        self.q=RxRing(maxsize=5)
         self.rx_stop=th.Event(); self.rx_th:Optional[th.Thread]=None
         # protocolos
         self.proto=RelojEnv.Proto()
@@ -186,12 +218,7 @@ class RelojEnv(gym.Env):
                 obs=np.array([float(v[0]),float(v[1]),float(v[2]),float(v[3]),int(float(v[4])),int(float(v[5])),int(float(v[6])),int(float(v[7])),float(v[8]),float(v[9]),float(v[10]),int(float(v[11])),float(v[12]),float(v[13]),float(v[14]),float(v[15]),float(v[16]),float(v[17]),float(v[18]),float(v[19]),float(v[20]),0.0],np.float32)
             else:
                 obs=np.array([float(v[0]),float(v[1]),float(v[2]),float(v[3]),int(float(v[4])),int(float(v[5])),int(float(v[6])),int(float(v[7])),float(v[8]),float(v[9]),float(v[10]),int(float(v[11])),float(v[12]),float(v[13]),float(v[14]),float(v[15]),float(v[16]),float(v[17]),float(v[18]),float(v[19]),float(v[20]),float(v[21])],np.float32)
-            try: self.q.put_nowait(obs)
-            except queue.Full:
-                try: _=self.q.get_nowait()
-                except queue.Empty: pass
-                try: self.q.put_nowait(obs)
-                except queue.Full: pass
+            self.q.put_nowait(obs)  # lleno: RxRing descarta la más vieja
         except Exception as e:
             self.log(f'_rx_parse error: {e}')
 
@@ -307,6 +334,10 @@ class RelojEnv(gym.Env):
     def set_corredera_mm(self,mm:float):   self.patch({'setpointX_mm':float(np.clip(mm,0,400))})
     def set_angulo_deg(self,dg:float):     self.patch({'setpointA_deg':float(np.clip(dg,0,360))})
     def set_volumen_objetivo_ml(self,ml:float): self.patch({'volumenObjetivoML':max(0.0,float(ml))})
+    # STOP en un solo patch y un único TX: energías 0, volumen 0, codigoModo=3 (sin EXECUTE)
+    def set_stop_state(self):
+        self.patch({'codigoModo':3,'energiaX':0,'energiaA':0,'energiaBomba':0,'volumenObjetivoML':0})
+        return self.step()
     def set_pid_corredera(self,kp,ki,kd):  self.patch({'kpX':round(float(kp),2),'kiX':round(float(ki),2),'kdX':round(float(kd),2)})
     def set_pid_angulo(self,kp,ki,kd):     self.patch({'kpA':round(float(kp),2),'kiA':round(float(ki),2),'kdA':round(float(kd),2)})
     def reset_volumen(self): self.patch({'resetVolumen':1})
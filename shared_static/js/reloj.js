@@ -208,14 +208,16 @@
         return;
       }
       if(data.type === "control_ack"){
-        const entry = awaiting.shift();
-        if(!entry) return;
-        clearTimeout(entry.timeout);
-        if(data.status === "ok"){
-          entry.resolve(data.body || {});
-        }else{
-          entry.reject(new Error(data.error || "control_error"));
-        }
+        // El servidor fusiona payloads encolados: un ack cubre `coalesced` envíos
+        const count = Math.max(1, Number(data.coalesced) || 1);
+        awaiting.splice(0, count).forEach(entry=>{
+          clearTimeout(entry.timeout);
+          if(data.status === "ok"){
+            entry.resolve(data.body || {});
+          }else{
+            entry.reject(new Error(data.error || "control_error"));
+          }
+        });
         flush();
         return;
       }
@@ -851,8 +853,24 @@
     refreshOverlay();
   }
 
+  // Fusiona un telemetry_delta sobre el último status (objetos anidados por clave)
+  function mergeStatusDelta(base, changes){
+    const out = Object.assign({}, base);
+    Object.keys(changes).forEach(k=>{
+      const v = changes[k];
+      const prev = out[k];
+      if(v && typeof v === 'object' && !Array.isArray(v) && prev && typeof prev === 'object' && !Array.isArray(prev)){
+        out[k] = mergeStatusDelta(prev, v);
+      }else{
+        out[k] = v;
+      }
+    });
+    return out;
+  }
+
   function createTelemetryChannel(onSnapshot){
     let socket = null;
+    let lastStatus = null;
     let reconnectTimer = null;
     let fallbackTimer = null;
     const startFallback = ()=>{
@@ -870,14 +888,19 @@
         try{ socket.close(); }catch{}
       }
       console.info('[ws/telemetry] connecting...');
-      socket = new WebSocket(`${WS_BASE}/ws/telemetry`);
+      lastStatus = null;
+      // delta=1: el servidor manda un keyframe "telemetry" y luego solo cambios
+      socket = new WebSocket(`${WS_BASE}/ws/telemetry?delta=1`);
       socket.addEventListener('open', ()=>{ setConnectionState('telemetry', true); stopFallback(); });
       socket.addEventListener('message', (event)=>{
         let data = null;
         try{ data = JSON.parse(event.data || "{}"); }catch{ return; }
         if(data.type === "telemetry"){
-          const status = data.status || {};
-          if(onSnapshot) onSnapshot(status);
+          lastStatus = data.status || {};
+          if(onSnapshot) onSnapshot(lastStatus);
+        }else if(data.type === "telemetry_delta" && lastStatus){
+          lastStatus = mergeStatusDelta(lastStatus, data.changes || {});
+          if(onSnapshot) onSnapshot(lastStatus);
         }
       });
       socket.addEventListener('close', ()=>{ setConnectionState('telemetry', false); startFallback(); scheduleReconnect(); });
@@ -971,6 +994,7 @@
     const btnStop = document.getElementById('btn_pb_gui_stop');
     if(!img || !window.fetch) return;
     let lastUrl = null;
+    let lastEtag = null;
     let timer = null;
     const setState = (msg, ok)=>{
       if(status) status.textContent = msg;
@@ -978,7 +1002,12 @@
     };
     const fetchFrame = async ()=>{
       try{
-        const res = await fetch(`/api/pybullet/frame?ts=${Date.now()}`, { cache: 'no-store' });
+        const headers = lastEtag ? { 'If-None-Match': lastEtag } : {};
+        const res = await fetch(`/api/pybullet/frame?ts=${Date.now()}`, { cache: 'no-store', headers });
+        if(res.status === 304){
+          setState("Visualización PyBullet en vivo", true);
+          return;
+        }
         if(res.status === 404){
           setState("PyBullet no disponible en este servidor.", false);
           if(timer){ clearInterval(timer); timer = null; }
@@ -988,6 +1017,7 @@
           throw new Error(`HTTP ${res.status}`);
         }
         const blob = await res.blob();
+        lastEtag = res.headers.get('ETag');
         if(lastUrl){ URL.revokeObjectURL(lastUrl); }
         lastUrl = URL.createObjectURL(blob);
         img.src = lastUrl;